@@ -7,22 +7,22 @@
 # USAGE: Run `python app.py` to start both API and web interface
 # ==============================================================================
 
-import gradio as gr
-import requests
 import json
+import orjson
 import os
 import asyncio
+import weakref
+import numpy as np
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 from dotenv import load_dotenv
+from cachetools import TTLCache
 import sqlalchemy as sa
-from sqlalchemy.orm import declarative_base, sessionmaker
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from fastapi import FastAPI, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncConnection
+from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
-import threading
+import subprocess
 
 # Import research tools
 try:
@@ -39,59 +39,106 @@ load_dotenv()
 # DATABASE SETUP
 # ==============================================================================
 
-DATABASE_URL = "sqlite+aiosqlite:///stock_market.db"
-engine = create_async_engine(DATABASE_URL, echo=False)
-async_session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
-Base = declarative_base()
+from database import engine, INSTRUMENTS, StockData, get_conn, stream_json_rows
 
-def create_stock_orm_model():
-    """Creates the SQLAlchemy ORM model for stock data."""
-    class StockData(Base):
-        __tablename__ = 'stock_data'
-        
-        id = sa.Column(sa.Integer, primary_key=True)
-        date = sa.Column(sa.DateTime)
-        natural_gas_price = sa.Column(sa.Float)
-        natural_gas_vol = sa.Column(sa.Float)
-        crude_oil_price = sa.Column(sa.Float)
-        crude_oil_vol = sa.Column(sa.Float)
-        copper_price = sa.Column(sa.Float)
-        copper_vol = sa.Column(sa.Float)
-        bitcoin_price = sa.Column(sa.Float)
-        bitcoin_vol = sa.Column(sa.Float)
-        platinum_price = sa.Column(sa.Float)
-        platinum_vol = sa.Column(sa.Float)
-        ethereum_price = sa.Column(sa.Float)
-        ethereum_vol = sa.Column(sa.Float)
-        s_p_500_price = sa.Column(sa.Float)
-        nasdaq_100_price = sa.Column(sa.Float)
-        nasdaq_100_vol = sa.Column(sa.Float)
-        apple_price = sa.Column(sa.Float)
-        apple_vol = sa.Column(sa.Float)
-        tesla_price = sa.Column(sa.Float)
-        tesla_vol = sa.Column(sa.Float)
-        microsoft_price = sa.Column(sa.Float)
-        microsoft_vol = sa.Column(sa.Float)
-        silver_price = sa.Column(sa.Float)
-        silver_vol = sa.Column(sa.Float)
-        google_price = sa.Column(sa.Float)
-        google_vol = sa.Column(sa.Float)
-        nvidia_price = sa.Column(sa.Float)
-        nvidia_vol = sa.Column(sa.Float)
-        berkshire_price = sa.Column(sa.Integer)
-        berkshire_vol = sa.Column(sa.Float)
-        netflix_price = sa.Column(sa.Float)
-        netflix_vol = sa.Column(sa.Float)
-        amazon_price = sa.Column(sa.Float)
-        amazon_vol = sa.Column(sa.Float)
-        meta_price = sa.Column(sa.Float)
-        meta_vol = sa.Column(sa.Float)
-        gold_price = sa.Column(sa.Float)
-        gold_vol = sa.Column(sa.Float)
-    
-    return StockData
+# Columns served by /api/latest-prices, keyed by their label in the response
+_LATEST_PRICE_COLS = {
+    "bitcoin": StockData.bitcoin_price,
+    "ethereum": StockData.ethereum_price,
+    "apple": StockData.apple_price,
+    "tesla": StockData.tesla_price,
+    "microsoft": StockData.microsoft_price,
+    "google": StockData.google_price,
+    "nvidia": StockData.nvidia_price,
+    "netflix": StockData.netflix_price,
+    "amazon": StockData.amazon_price,
+    "meta": StockData.meta_price,
+    "gold": StockData.gold_price,
+    "silver": StockData.silver_price,
+    "crude_oil": StockData.crude_oil_price,
+    "sp_500": StockData.s_p_500_price,
+    "nasdaq": StockData.nasdaq_100_price
+}
+_LATEST_COLS = (StockData.date, *_LATEST_PRICE_COLS.values())
+
+# Symbols accepted by /api/historical-analysis and their price columns
+_SYMBOL_COL = {
+    "AAPL": StockData.apple_price,
+    "TSLA": StockData.tesla_price,
+    "MSFT": StockData.microsoft_price,
+    "GOOGL": StockData.google_price,
+    "NVDA": StockData.nvidia_price,
+    "NFLX": StockData.netflix_price,
+    "AMZN": StockData.amazon_price,
+    "META": StockData.meta_price,
+    "BTC": StockData.bitcoin_price,
+    "ETH": StockData.ethereum_price,
+    "GOLD": StockData.gold_price,
+    "SILVER": StockData.silver_price,
+    "OIL": StockData.crude_oil_price,
+    "SP500": StockData.s_p_500_price,
+    "NASDAQ": StockData.nasdaq_100_price
+}
+
+# Static payloads are encoded once at import rather than per request
+_ROOT_PAYLOAD = {
+    "message": "Stock Market Analysis API",
+    "endpoints": {
+        "dashboard": "/api/dashboard",
+        "latest_prices": "/api/latest-prices",
+        "market_overview": "/api/market-overview",
+        "stock_data": "/api/stock-datas",
+        "historical": "/api/historical-analysis?symbol=AAPL&days=30",
+        "tools": "/tools"
+    }
+}
+_ROOT_BYTES = orjson.dumps(_ROOT_PAYLOAD)
+
+_TOOLS_PAYLOAD = {
+    "tools": [
+        {
+            "type": "function",
+            "function": {
+                "name": "get_latest_prices",
+                "description": "Get latest stock market prices",
+                "parameters": {"type": "object", "properties": {}}
+            }
+        },
+        {
+            "type": "function", 
+            "function": {
+                "name": "get_market_overview",
+                "description": "Get market overview and available instruments",
+                "parameters": {"type": "object", "properties": {}}
+            }
+        },
+        {
+            "type": "function",
+            "function": {
+                "name": "get_historical_analysis",
+                "description": "Get historical price analysis for a symbol",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "symbol": {
+                            "type": "string",
+                            "description": "Stock symbol (e.g., AAPL, TSLA, BTC)"
+                        },
+                        "days": {
+                            "type": "integer",
+                            "description": "Number of days to analyze (default: 30)"
+                        }
+                    },
+                    "required": ["symbol"]
+                }
+            }
+        }
+    ]
+}
+_TOOLS_BYTES = orjson.dumps(_TOOLS_PAYLOAD)
 
-StockData = create_stock_orm_model()
+# The static payloads only change on redeploy, so let clients and proxies reuse them
+_STATIC_HEADERS = {"Cache-Control": "public, max-age=3600"}
 
 # ==============================================================================
 # FASTAPI APP
@@ -100,7 +147,8 @@ StockData = create_stock_orm_model()
 app = FastAPI(
     title="Stock Market Analysis",
     description="Simple stock market data API with research tools",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -111,209 +159,143 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-async def get_session() -> AsyncSession:
-    async with async_session_factory() as session:
-        yield session
+# Latest-row responses only change when new data is ingested
+_response_cache = TTLCache(maxsize=8, ttl=30)
+# One lock per key, so concurrent misses for a key share a single build while
+# other keys refresh independently; unused locks are dropped automatically
+_cache_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+async def _cached_response(key: str, build):
+    """Return the cached response for key, building it once on a miss."""
+    response = _response_cache.get(key)
+    if response is None:
+        lock = _cache_locks.get(key)
+        if lock is None:
+            lock = _cache_locks[key] = asyncio.Lock()
+        async with lock:
+            response = _response_cache.get(key)
+            if response is None:
+                response = await build()
+                _response_cache[key] = response
+    return response
 
 @app.get("/")
 async def root():
-    return {
-        "message": "Stock Market Analysis API",
-        "endpoints": {
-            "latest_prices": "/api/latest-prices",
-            "market_overview": "/api/market-overview",
-            "stock_data": "/api/stock-datas",
-            "historical": "/api/historical-analysis?symbol=AAPL&days=30",
-            "tools": "/tools"
-        }
-    }
+    return Response(content=_ROOT_BYTES, media_type="application/json", headers=_STATIC_HEADERS)
 
-@app.get("/api/latest-prices")
-async def get_latest_prices(session: AsyncSession = Depends(get_session)):
-    """Get latest stock prices"""
-    result = await session.execute(
-        sa.select(StockData).order_by(StockData.date.desc()).limit(1)
+async def _latest_prices(conn: AsyncConnection) -> Dict[str, Any]:
+    """Build the latest-prices response from the newest row"""
+    result = await conn.execute(
+        sa.select(*_LATEST_COLS).order_by(StockData.date.desc()).limit(1)
     )
-    record = result.scalar_one_or_none()
+    row = result.mappings().one_or_none()
     
-    if not record:
+    if not row:
         raise HTTPException(status_code=404, detail="No data available")
     
     return {
-        "date": record.date.isoformat() if record.date else None,
-        "prices": {
-            "bitcoin": record.bitcoin_price,
-            "ethereum": record.ethereum_price,
-            "apple": record.apple_price,
-            "tesla": record.tesla_price,
-            "microsoft": record.microsoft_price,
-            "google": record.google_price,
-            "nvidia": record.nvidia_price,
-            "netflix": record.netflix_price,
-            "amazon": record.amazon_price,
-            "meta": record.meta_price,
-            "gold": record.gold_price,
-            "silver": record.silver_price,
-            "crude_oil": record.crude_oil_price,
-            "sp_500": record.s_p_500_price,
-            "nasdaq": record.nasdaq_100_price
-        }
+        "date": row["date"].isoformat() if row["date"] else None,
+        "prices": {label: row[col.key] for label, col in _LATEST_PRICE_COLS.items()}
     }
 
-@app.get("/api/market-overview")
-async def get_market_overview(session: AsyncSession = Depends(get_session)):
-    """Get market overview"""
-    result = await session.execute(
-        sa.select(StockData).order_by(StockData.date.desc()).limit(1)
+@app.get("/api/latest-prices", deprecated=True)
+async def get_latest_prices(conn: AsyncConnection = Depends(get_conn)):
+    """Get latest stock prices"""
+    return await _cached_response("latest", lambda: _latest_prices(conn))
+
+async def _market_overview(conn: AsyncConnection) -> Dict[str, Any]:
+    """Build the market overview response"""
+    result = await conn.execute(
+        sa.select(StockData.date).order_by(StockData.date.desc()).limit(1)
     )
-    latest = result.scalar_one_or_none()
+    latest = result.first()
     
     if not latest:
         raise HTTPException(status_code=404, detail="No data available")
     
     return {
         "latest_date": latest.date.isoformat() if latest.date else None,
-        "available_instruments": [
-            "bitcoin", "ethereum", "apple", "tesla", "microsoft", 
-            "google", "nvidia", "netflix", "amazon", "meta",
-            "gold", "silver", "platinum", "copper", "crude_oil", 
-            "natural_gas", "sp_500", "nasdaq_100", "berkshire"
-        ]
+        "available_instruments": INSTRUMENTS
+    }
+
+@app.get("/api/market-overview", deprecated=True)
+async def get_market_overview(conn: AsyncConnection = Depends(get_conn)):
+    """Get market overview"""
+    return await _cached_response("overview", lambda: _market_overview(conn))
+
+async def _dashboard(conn: AsyncConnection) -> Dict[str, Any]:
+    """Build the combined prices and instruments response from one query"""
+    return {
+        "latest": await _latest_prices(conn),
+        "instruments": INSTRUMENTS
     }
 
+@app.get("/api/dashboard")
+async def get_dashboard(conn: AsyncConnection = Depends(get_conn)):
+    """Get latest prices and available instruments in one round trip"""
+    return await _cached_response("dashboard", lambda: _dashboard(conn))
+
 @app.get("/api/stock-datas")
-async def get_stock_datas(
-    limit: int = 100,
-    offset: int = 0,
-    session: AsyncSession = Depends(get_session)
-):
+async def get_stock_datas(limit: int = Query(100, gt=0, le=1000), offset: int = Query(0, ge=0)):
     """Get stock data with pagination"""
-    query = sa.select(StockData).limit(limit).offset(offset)
-    result = await session.execute(query)
-    records = result.scalars().all()
-    
-    data = []
-    for record in records:
-        record_dict = {}
-        for column in StockData.__table__.columns:
-            value = getattr(record, column.name)
-            if isinstance(value, datetime):
-                value = value.isoformat()
-            record_dict[column.name] = value
-        data.append(record_dict)
-    
-    return {"data": data, "total": len(data)}
+    query = sa.select(StockData.__table__).limit(limit).offset(offset)
+    # Stream rows in batches so large pages never sit in memory at once
+    return StreamingResponse(stream_json_rows(query), media_type="application/json")
 
-@app.get("/api/historical-analysis")
-async def get_historical_analysis(
-    symbol: str,
-    days: int = 30,
-    session: AsyncSession = Depends(get_session)
-):
-    """Get historical analysis for a symbol"""
-    # Map symbol to column name
-    symbol_map = {
-        "AAPL": "apple_price",
-        "TSLA": "tesla_price", 
-        "MSFT": "microsoft_price",
-        "GOOGL": "google_price",
-        "NVDA": "nvidia_price",
-        "NFLX": "netflix_price",
-        "AMZN": "amazon_price",
-        "META": "meta_price",
-        "BTC": "bitcoin_price",
-        "ETH": "ethereum_price",
-        "GOLD": "gold_price",
-        "SILVER": "silver_price",
-        "OIL": "crude_oil_price",
-        "SP500": "s_p_500_price",
-        "NASDAQ": "nasdaq_100_price"
-    }
-    
-    column_name = symbol_map.get(symbol.upper())
-    if not column_name:
+async def _historical_analysis(conn: AsyncConnection, symbol: str, days: int) -> Dict[str, Any]:
+    """Build the historical analysis response for a symbol"""
+    price_col = _SYMBOL_COL.get(symbol.upper())
+    if price_col is None:
         raise HTTPException(status_code=400, detail=f"Symbol {symbol} not supported")
     
-    # Get historical data
-    result = await session.execute(
-        sa.select(StockData).order_by(StockData.date.desc()).limit(days)
+    # Take the newest `days` prices, then let SQLite return them oldest first
+    recent = (
+        sa.select(StockData.date, price_col)
+        .where(price_col.isnot(None))
+        .order_by(StockData.date.desc())
+        .limit(days)
+        .subquery()
     )
-    records = result.scalars().all()
-    
-    if not records:
-        raise HTTPException(status_code=404, detail="No data available")
-    
-    # Extract prices
-    prices = []
-    dates = []
-    for record in reversed(records):  # Oldest first
-        price = getattr(record, column_name)
-        if price is not None:
-            prices.append(price)
-            dates.append(record.date.isoformat() if record.date else None)
+    result = await conn.execute(
+        sa.select(recent.c.date, recent.c[price_col.key]).order_by(recent.c.date.asc())
+    )
+    rows = result.all()
     
-    if not prices:
+    if not rows:
         raise HTTPException(status_code=404, detail="No price data available")
     
+    prices = np.fromiter((price for _, price in rows), dtype=np.float64, count=len(rows))
+    dates = [date.isoformat() if date else None for date, _ in rows]
+    
     # Calculate basic statistics
-    current_price = prices[-1]
-    price_change = current_price - prices[0] if len(prices) > 1 else 0
-    percent_change = (price_change / prices[0] * 100) if prices[0] != 0 else 0
+    first_price = float(prices[0])
+    current_price = float(prices[-1])
+    price_change = current_price - first_price if prices.size > 1 else 0
+    percent_change = (price_change / first_price * 100) if first_price != 0 else 0
     
     return {
         "symbol": symbol.upper(),
         "current_price": current_price,
         "price_change": price_change,
         "percent_change": round(percent_change, 2),
-        "data_points": len(prices),
-        "prices": prices,
+        "data_points": int(prices.size),
+        "prices": prices.tolist(),
         "dates": dates
     }
 
+@app.get("/api/historical-analysis")
+async def get_historical_analysis(
+    symbol: str,
+    days: int = 30,
+    conn: AsyncConnection = Depends(get_conn)
+):
+    """Get historical analysis for a symbol"""
+    return await _historical_analysis(conn, symbol, days)
+
 @app.get("/tools")
 async def get_tools():
     """Get available tools for LLM integration"""
-    return {
-        "tools": [
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_latest_prices",
-                    "description": "Get latest stock market prices",
-                    "parameters": {"type": "object", "properties": {}}
-                }
-            },
-            {
-                "type": "function", 
-                "function": {
-                    "name": "get_market_overview",
-                    "description": "Get market overview and available instruments",
-                    "parameters": {"type": "object", "properties": {}}
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_historical_analysis",
-                    "description": "Get historical price analysis for a symbol",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "symbol": {
-                                "type": "string",
-                                "description": "Stock symbol (e.g., AAPL, TSLA, BTC)"
-                            },
-                            "days": {
-                                "type": "integer",
-                                "description": "Number of days to analyze (default: 30)"
-                            }
-                        },
-                        "required": ["symbol"]
-                    }
-                }
-            }
-        ]
-    }
+    return Response(content=_TOOLS_BYTES, media_type="application/json", headers=_STATIC_HEADERS)
 
 # ==============================================================================
 # GRADIO INTERFACE
@@ -321,44 +303,49 @@ async def get_tools():
 
 def create_simple_interface():
     """Create a simplified Gradio interface"""
+    # Imported here so API worker processes never load Gradio
+    import gradio as gr
+    
+    # Callbacks query the database directly instead of looping back over HTTP
+    async def get_dashboard_data():
+        """Fetch the shared dashboard payload used by the Prices and Overview tabs"""
+        async with engine.connect() as conn:
+            return await _cached_response("dashboard", lambda: _dashboard(conn))
     
-    def get_latest_prices_ui():
-        """Get latest prices from API"""
+    async def get_latest_prices_ui():
+        """Get latest prices"""
         try:
-            response = requests.get("http://localhost:8001/api/latest-prices")
-            if response.status_code == 200:
-                data = response.json()
-                prices = data.get("prices", {})
-                
-                result = f"**Latest Prices ({data.get('date', 'N/A')})**\n\n"
-                for symbol, price in prices.items():
-                    if price is not None:
-                        result += f"• {symbol.upper()}: ${price:,.2f}\n"
-                return result
-            else:
-                return f"Error: {response.status_code}"
+            data = (await get_dashboard_data())["latest"]
+            prices = data.get("prices", {})
+            
+            result = f"**Latest Prices ({data.get('date', 'N/A')})**\n\n"
+            for symbol, price in prices.items():
+                if price is not None:
+                    result += f"• {symbol.upper()}: ${price:,.2f}\n"
+            return result
+        except HTTPException as e:
+            return f"Error: {e.status_code}"
         except Exception as e:
             return f"Error: {str(e)}"
     
-    def analyze_symbol_ui(symbol, days):
+    async def analyze_symbol_ui(symbol, days):
         """Analyze a specific symbol"""
         if not symbol:
             return "Please enter a symbol"
         
         try:
-            response = requests.get(f"http://localhost:8001/api/historical-analysis?symbol={symbol}&days={days}")
-            if response.status_code == 200:
-                data = response.json()
-                
-                result = f"**{data['symbol']} Analysis ({days} days)**\n\n"
-                result += f"• Current Price: ${data['current_price']:,.2f}\n"
-                result += f"• Price Change: ${data['price_change']:,.2f}\n"
-                result += f"• Percent Change: {data['percent_change']}%\n"
-                result += f"• Data Points: {data['data_points']}\n"
-                
-                return result
-            else:
-                return f"Error: {response.status_code} - {response.text}"
+            async with engine.connect() as conn:
+                data = await _historical_analysis(conn, symbol, int(days))
+            
+            result = f"**{data['symbol']} Analysis ({days} days)**\n\n"
+            result += f"• Current Price: ${data['current_price']:,.2f}\n"
+            result += f"• Price Change: ${data['price_change']:,.2f}\n"
+            result += f"• Percent Change: {data['percent_change']}%\n"
+            result += f"• Data Points: {data['data_points']}\n"
+            
+            return result
+        except HTTPException as e:
+            return f"Error: {e.status_code} - {e.detail}"
         except Exception as e:
             return f"Error: {str(e)}"
     
@@ -377,22 +364,20 @@ def create_simple_interface():
         except Exception as e:
             return f"Research error: {str(e)}"
     
-    def get_market_overview_ui():
+    async def get_market_overview_ui():
         """Get market overview"""
         try:
-            response = requests.get("http://localhost:8001/api/market-overview")
-            if response.status_code == 200:
-                data = response.json()
-                
-                result = f"**Market Overview ({data.get('latest_date', 'N/A')})**\n\n"
-                result += "**Available Instruments:**\n"
-                instruments = data.get("available_instruments", [])
-                for i, instrument in enumerate(instruments, 1):
-                    result += f"{i}. {instrument.upper()}\n"
-                
-                return result
-            else:
-                return f"Error: {response.status_code}"
+            data = await get_dashboard_data()
+            
+            result = f"**Market Overview ({data['latest'].get('date', 'N/A')})**\n\n"
+            result += "**Available Instruments:**\n"
+            instruments = data["instruments"]
+            for i, instrument in enumerate(instruments, 1):
+                result += f"{i}. {instrument.upper()}\n"
+            
+            return result
+        except HTTPException as e:
+            return f"Error: {e.status_code}"
         except Exception as e:
             return f"Error: {str(e)}"
     
@@ -436,7 +421,7 @@ def create_simple_interface():
         
         # Footer
         gr.Markdown("---")
-        gr.Markdown("**API Endpoints:** `/api/latest-prices`, `/api/market-overview`, `/api/historical-analysis`, `/tools`")
+        gr.Markdown("**API Endpoints:** `/api/dashboard`, `/api/historical-analysis`, `/api/stock-datas`, `/tools`")
     
     return interface
 
@@ -444,17 +429,25 @@ def create_simple_interface():
 # MAIN APPLICATION
 # ==============================================================================
 
-def start_api_server():
-    """Start the FastAPI server in a separate thread"""
-    uvicorn.run(app, host="0.0.0.0", port=8001, log_level="info")
+def start_api_server() -> subprocess.Popen:
+    """Start the FastAPI server as a multi-worker Gunicorn process"""
+    # A couple of SQLite readers are plenty for a local demo; raise API_WORKERS to scale
+    workers = max(1, int(os.getenv("API_WORKERS", "2")))
+    return subprocess.Popen([
+        "gunicorn", "app:app",
+        "-k", "uvicorn.workers.UvicornWorker",
+        "-w", str(workers),
+        "-b", "0.0.0.0:8001",
+        "--preload",
+        "--log-level", "warning"
+    ])
 
 def main():
     """Main function to start both API and Gradio interface"""
     print("🚀 Starting Stock Market Analysis Platform...")
     
-    # Start API server in background
-    api_thread = threading.Thread(target=start_api_server, daemon=True)
-    api_thread.start()
+    # Start API server in its own worker processes
+    api_process = start_api_server()
     
     print("📖 API Documentation: http://localhost:8001/docs")
     print("🔧 API Root: http://localhost:8001/")
@@ -466,12 +459,15 @@ def main():
     # Start Gradio interface
     print("🌐 Starting Web Interface...")
     interface = create_simple_interface()
-    interface.launch(
-        server_name="0.0.0.0",
-        server_port=7860,
-        share=False,
-        show_error=True
-    )
+    try:
+        interface.launch(
+            server_name="0.0.0.0",
+            server_port=7860,
+            share=False,
+            show_error=True
+        )
+    finally:
+        api_process.terminate()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
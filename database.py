@@ -0,0 +1,139 @@
+# ==============================================================================
+# FILE: database.py
+#
+# PURPOSE: Shared SQLite database layer for the stock market APIs. Defines
+#          the async engine, connection dependency and StockData ORM model
+#          used by both app.py and unified_app.py.
+# ==============================================================================
+
+from functools import lru_cache
+
+import orjson
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncConnection
+
+# Database URL for SQLite (async version)
+DATABASE_URL = "sqlite+aiosqlite:///stock_market.db"
+
+# Create an async engine with a pooled set of reusable connections
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=False,
+    pool_size=20,
+    max_overflow=10,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    connect_args={"check_same_thread": False, "timeout": 30}
+)
+
+# Enable WAL and memory-mapped I/O so readers don't block on writers
+@event.listens_for(engine.sync_engine, "connect")
+def _set_sqlite_pragmas(dbapi_conn, connection_record):
+    """Apply performance PRAGMAs to every new SQLite connection."""
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.close()
+
+# Define the base for our ORM models
+Base = declarative_base()
+
+# --- ORM Model Definition ---
+class StockData(Base):
+    """SQLAlchemy ORM model for stock data."""
+    __tablename__ = 'stock_data'
+    # Newest-first index backing every ORDER BY date DESC LIMIT n query;
+    # database_setup.py creates it when loading the CSV
+    __table_args__ = (sa.Index('ix_stock_data_date', sa.text('date DESC')),)
+    
+    # Define all columns
+    id = sa.Column(sa.Integer, primary_key=True)
+    date = sa.Column(sa.DateTime)
+    natural_gas_price = sa.Column(sa.Float)
+    natural_gas_vol = sa.Column(sa.Float)
+    crude_oil_price = sa.Column(sa.Float)
+    crude_oil_vol = sa.Column(sa.Float)
+    copper_price = sa.Column(sa.Float)
+    copper_vol = sa.Column(sa.Float)
+    bitcoin_price = sa.Column(sa.Float)
+    bitcoin_vol = sa.Column(sa.Float)
+    platinum_price = sa.Column(sa.Float)
+    platinum_vol = sa.Column(sa.Float)
+    ethereum_price = sa.Column(sa.Float)
+    ethereum_vol = sa.Column(sa.Float)
+    s_p_500_price = sa.Column(sa.Float)
+    nasdaq_100_price = sa.Column(sa.Float)
+    nasdaq_100_vol = sa.Column(sa.Float)
+    apple_price = sa.Column(sa.Float)
+    apple_vol = sa.Column(sa.Float)
+    tesla_price = sa.Column(sa.Float)
+    tesla_vol = sa.Column(sa.Float)
+    microsoft_price = sa.Column(sa.Float)
+    microsoft_vol = sa.Column(sa.Float)
+    silver_price = sa.Column(sa.Float)
+    silver_vol = sa.Column(sa.Float)
+    google_price = sa.Column(sa.Float)
+    google_vol = sa.Column(sa.Float)
+    nvidia_price = sa.Column(sa.Float)
+    nvidia_vol = sa.Column(sa.Float)
+    berkshire_price = sa.Column(sa.Integer)
+    berkshire_vol = sa.Column(sa.Float)
+    netflix_price = sa.Column(sa.Float)
+    netflix_vol = sa.Column(sa.Float)
+    amazon_price = sa.Column(sa.Float)
+    amazon_vol = sa.Column(sa.Float)
+    meta_price = sa.Column(sa.Float)
+    meta_vol = sa.Column(sa.Float)
+    gold_price = sa.Column(sa.Float)
+    gold_vol = sa.Column(sa.Float)
+
+# Instrument names covered by stock_data, listed by app.py's overview and
+# dashboard responses (unified_app.py does not report instruments)
+INSTRUMENTS = (
+    "bitcoin", "ethereum", "apple", "tesla", "microsoft",
+    "google", "nvidia", "netflix", "amazon", "meta",
+    "gold", "silver", "platinum", "copper", "crude_oil",
+    "natural_gas", "sp_500", "nasdaq_100", "berkshire"
+)
+
+# --- FastAPI integration ---
+async def get_conn() -> AsyncConnection:
+    """FastAPI dependency providing a plain connection for read-only Core queries."""
+    async with engine.connect() as conn:
+        yield conn
+
+@lru_cache(maxsize=None)
+def _row_encoder(column_names: tuple):
+    """Generate a row -> JSON bytes encoder with the column names baked in."""
+    fields = ", ".join(f"{name!r}: r[{i}]" for i, name in enumerate(column_names))
+    namespace = {"dumps": orjson.dumps}
+    exec(f"def encode(r): return dumps({{{fields}}})", namespace)
+    return namespace["encode"]
+
+async def stream_json_rows(stmt, batch_size: int = 1000, cursor_column: str = None):
+    """Yield {"data": [...], "total": n} as JSON bytes, one batch of rows at a time.
+
+    With cursor_column set, the payload also carries "next_cursor": that
+    column's value in the last row streamed (null for an empty page).
+    """
+    async with engine.connect() as conn:
+        result = await conn.stream(stmt.execution_options(yield_per=batch_size))
+        encode = _row_encoder(tuple(result.keys()))
+        total = 0
+        last = None
+        yield b'{"data":['
+        async for partition in result.partitions():
+            chunk = b",".join(map(encode, partition))
+            yield (b"," + chunk) if total else chunk
+            total += len(partition)
+            last = partition[-1]
+        if cursor_column is None:
+            yield b'],"total":%d}' % total
+        else:
+            cursor = last._mapping[cursor_column] if last is not None else None
+            yield b'],"total":%d,"next_cursor":%s}' % (total, orjson.dumps(cursor))
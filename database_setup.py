@@ -4,18 +4,28 @@
 # PURPOSE: Reads the stock market CSV, cleans the data, and loads it into a
 #          SQLite database. This script should be run once to set up the DB.
 # ==============================================================================
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine, text
+import sqlite3
 import re
 import os
 
+# SQLite column types matching what SQLAlchemy/to_sql used to create
+_SQLITE_TYPES = {'i': 'BIGINT', 'f': 'FLOAT', 'M': 'DATETIME'}
+
+# Raw CSV columns left to the parser because StockData declares them Integer
+_INTEGER_COLUMNS = {'Berkshire_Price'}
+
+# Runs of characters that are not valid in SQL/Python identifiers
+_CLEAN_RE = re.compile(r'[^0-9a-zA-Z_]+')
+
 def clean_col_names(df):
     """Cleans DataFrame column names to be valid SQL/Python identifiers."""
     cols = df.columns
     new_cols = []
     for col in cols:
         # Lowercase, replace special chars with underscore, remove leading/trailing junk
-        new_col = re.sub(r'[^0-9a-zA-Z_]+', '_', col).lower()
+        new_col = _CLEAN_RE.sub('_', col).lower()
         new_col = new_col.strip('_')
         # Ensure it's a valid identifier (doesn't start with a number)
         if new_col and new_col[0].isdigit():
@@ -24,6 +34,37 @@ def clean_col_names(df):
     df.columns = new_cols
     return df
 
+def clean_chunk(df):
+    """Cleans one chunk of the raw CSV into the stock_data column layout."""
+    # Clean column names
+    df = clean_col_names(df)
+    
+    # Drop the original unnamed index column if it exists
+    if 'unnamed_0' in df.columns:
+        df = df.drop(columns=['unnamed_0'])
+
+    # Convert date column; the dataset uses day-first dd-mm-yyyy dates
+    dates = pd.to_datetime(df['date'], format='%d-%m-%Y', errors='coerce', cache=True)
+
+    # Only values that miss the fixed format go through the flexible parser
+    retry = dates.isna() & df['date'].notna()
+    if retry.any():
+        dates[retry] = pd.to_datetime(
+            df.loc[retry, 'date'], format='mixed', dayfirst=True, errors='coerce', cache=True
+        )
+
+    # Keep only rows with a valid date, slicing once before the numeric work
+    valid = dates.notna()
+    df = df.loc[valid].assign(date=dates[valid])
+
+    # Coerce any column the parser could not read as numbers. Those columns
+    # come back as raw strings, so strip thousands separators first.
+    for col in df.select_dtypes(exclude=['number', 'datetime']).columns:
+        cleaned = [v.replace(',', '') if isinstance(v, str) else v for v in df[col].values]
+        df[col] = pd.to_numeric(cleaned, errors='coerce')
+
+    return df
+
 def setup_database():
     """Main function to perform the database setup."""
     csv_file_path = 'Stock Market Dataset 2.csv'
@@ -41,49 +82,73 @@ def setup_database():
         print(f"Removed existing database '{db_file_path}'.")
 
     print("Reading and cleaning stock market data...")
-    # Read the CSV
-    df = pd.read_csv(csv_file_path)
+    # Declare column types up front so the C parser emits floats directly
+    header = pd.read_csv(csv_file_path, nrows=0).columns
+    dtypes = {
+        col: 'float64' for col in header
+        if col != 'Date' and not col.startswith('Unnamed') and col not in _INTEGER_COLUMNS
+    }
+    dtypes['Date'] = str
 
-    # Clean column names
-    df = clean_col_names(df)
-    
-    # Drop the original unnamed index column if it exists
-    if 'unnamed_0' in df.columns:
-        df = df.drop(columns=['unnamed_0'])
+    # Read the CSV in chunks; the C parser strips thousands separators itself
+    chunks = pd.read_csv(
+        csv_file_path,
+        chunksize=100_000,
+        dtype=dtypes,
+        thousands=','
+    )
 
-    # Convert date column
-    df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    print(f"\nLoading data into '{table_name}' table in '{db_file_path}'...")
+    connection = sqlite3.connect(db_file_path)
+    connection.execute("PRAGMA synchronous=OFF")
+    connection.execute("PRAGMA journal_mode=MEMORY")
+    connection.execute("PRAGMA temp_store=MEMORY")
 
-    # Clean numeric columns by removing commas and converting to float
-    for col in df.columns:
-        # Only process object columns that are not the date column
-        if df[col].dtype == 'object' and col != 'date':
-            # Ensure the column is treated as a string before using .str accessor
-            df[col] = df[col].astype(str).str.replace(',', '', regex=False)
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+    # One transaction for the whole load, one executemany per chunk
+    row_count = 0
+    insert_sql = None
+    with connection:
+        for df in chunks:
+            df = clean_chunk(df)
 
-    # Drop rows where date is NaT (Not a Time) after conversion
-    df.dropna(subset=['date'], inplace=True)
-    
-    # The primary key in enrichmcp should not be null.
-    # We add a simple integer primary key.
-    df.insert(0, 'id', range(1, 1 + len(df)))
+            # The primary key in enrichmcp should not be null.
+            # We add a simple integer primary key, continuing across chunks.
+            df.insert(0, 'id', np.arange(row_count + 1, row_count + 1 + len(df), dtype=np.int64))
+            row_count += len(df)
 
-    print(f"Cleaned Data Head:\n{df.head()}")
-    print(f"\nData Types:\n{df.dtypes}")
+            if insert_sql is None:
+                print(f"Cleaned Data Head:\n{df.head()}")
+                print(f"\nData Types:\n{df.dtypes}")
 
-    # Create SQLite engine and load data
-    engine = create_engine(f'sqlite:///{db_file_path}')
-    print(f"\nLoading data into '{table_name}' table in '{db_file_path}'...")
-    
-    # Use pandas to_sql to create the table and insert the data
-    df.to_sql(table_name, engine, if_exists='replace', index=False)
-
-    # Verify the data insertion
-    with engine.connect() as connection:
-        result = connection.execute(text(f"SELECT COUNT(*) FROM {table_name}"))
-        count = result.scalar_one()
-        print(f"Successfully loaded {count} rows into the database.")
+                # id is declared INTEGER PRIMARY KEY so it aliases the SQLite rowid
+                columns = ", ".join(
+                    f"{col} {_SQLITE_TYPES.get(dtype.kind, 'TEXT')}"
+                    for col, dtype in df.dtypes.items()
+                    if col != 'id'
+                )
+                columns = f"id INTEGER PRIMARY KEY, {columns}"
+                connection.execute(f"CREATE TABLE {table_name} ({columns})")
+                insert_sql = f"INSERT INTO {table_name} VALUES ({', '.join('?' * len(df.columns))})"
+
+            # Store dates in the same text format SQLAlchemy reads back
+            df['date'] = df['date'].dt.strftime('%Y-%m-%d %H:%M:%S.%f')
+            connection.executemany(insert_sql, df.itertuples(index=False, name=None))
+
+        # Index the date column; the API always reads newest-first. With no
+        # chunks read the table was never created, so there is nothing to index.
+        if insert_sql is not None:
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS ix_{table_name}_date ON {table_name}(date DESC)"
+            )
+        else:
+            print(f"Warning: no data rows found in '{csv_file_path}'; '{table_name}' was not created.")
+
+    # Leave the file in WAL mode, which the API requests on every connection,
+    # so opening it read-only never has to rewrite the database header
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.close()
+    # Every inserted row was counted above, so no COUNT(*) scan is needed
+    print(f"Successfully loaded {row_count} rows into the database.")
         
     print("Database setup complete.")
 
@@ -3,32 +3,41 @@
 Demonstration script for Consilium MCP + Enrich MCP Integration
 Shows how historical market data is integrated into expert consensus
 """
+import asyncio
+import httpx
 import requests
 import json
 
+# Shared session so repeated calls reuse the same keep-alive connection
+_session = requests.Session()
+
+async def _fetch_demo_data(base_url):
+    """Fetch the tools, overview and sample data endpoints concurrently"""
+    async with httpx.AsyncClient(base_url=base_url, timeout=10.0) as client:
+        responses = await asyncio.gather(
+            client.get("/tools"),
+            client.get("/api/market-overview"),
+            client.get("/api/stock-datas", params={"limit": 3})
+        )
+    return [response.json() for response in responses]
+
 def demo_enrich_mcp_api():
     """Demonstrate the Enrich MCP API capabilities"""
     print("🌐 Enrich MCP API Demonstration")
     print("=" * 50)
     
     base_url = "http://localhost:8001"
+    tools, overview, data = asyncio.run(_fetch_demo_data(base_url))
     
     # Demo 1: Get available functions
     print("\n📋 Available Functions:")
-    response = requests.get(f"{base_url}/tools")
-    tools = response.json()
-    
     historical_functions = [f['function']['name'] for f in tools['tools'] 
                           if 'historical' in f['function']['name'] or 'market' in f['function']['name']]
     
-    for func in historical_functions:
-        print(f"  • {func}")
+    print("\n".join(f"  • {func}" for func in historical_functions))
     
     # Demo 2: Market overview
     print("\n📊 Market Overview:")
-    response = requests.get(f"{base_url}/api/market-overview")
-    overview = response.json()
-    
     latest_prices = overview['latest_prices']
     print(f"  Latest Date: {overview['latest_date']}")
     print(f"  Bitcoin: ${latest_prices['bitcoin']:,.2f}")
@@ -38,12 +47,10 @@ def demo_enrich_mcp_api():
     
     # Demo 3: Historical data
     print("\n📈 Historical Data Sample:")
-    response = requests.get(f"{base_url}/api/stock-datas?limit=3")
-    data = response.json()
-    
-    for record in data['data']:
-        date = record['date'][:10]  # Just the date part
-        print(f"  {date}: Bitcoin ${record['bitcoin_price']:,.2f}, Apple ${record['apple_price']:,.2f}")
+    print("\n".join(
+        f"  {record['date'][:10]}: Bitcoin ${record['bitcoin_price']:,.2f}, Apple ${record['apple_price']:,.2f}"
+        for record in data['data']
+    ))
 
 def demo_consilium_integration():
     """Demonstrate how Consilium MCP would use the integration"""
@@ -114,11 +121,13 @@ def demo_query_examples():
         }
     ]
     
-    for i, example in enumerate(examples, 1):
-        print(f"\n{i}. Query: '{example['query']}'")
-        print(f"   Tool: {example['tool']}")
-        print(f"   Function: {example['function']}")
-        print(f"   Analysis: {example['analysis']}")
+    print("\n".join(
+        f"\n{i}. Query: '{example['query']}'\n"
+        f"   Tool: {example['tool']}\n"
+        f"   Function: {example['function']}\n"
+        f"   Analysis: {example['analysis']}"
+        for i, example in enumerate(examples, 1)
+    ))
 
 def demo_integration_benefits():
     """Demonstrate the benefits of the integration"""
@@ -136,8 +145,7 @@ def demo_integration_benefits():
         "⚡ Fast Access: Direct API calls to historical database"
     ]
     
-    for benefit in benefits:
-        print(f"  {benefit}")
+    print("\n".join(f"  {benefit}" for benefit in benefits))
 
 def main():
     """Run the complete demonstration"""
@@ -146,7 +154,7 @@ def main():
     
     # Check if server is running
     try:
-        response = requests.get("http://localhost:8001/", timeout=5)
+        response = _session.get("http://localhost:8001/", timeout=5)
         print("✅ Enrich MCP server is running")
     except:
         print("❌ Enrich MCP server is not running")
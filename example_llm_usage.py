@@ -7,21 +7,39 @@
 # USAGE: Run `python example_llm_usage.py` to see example interactions.
 # ==============================================================================
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+from functools import lru_cache
 from typing import Dict, Any
 
+# One keep-alive connection pool for every API call, shared by all clients
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=(502, 503, 504))
+)
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+
+# Seconds to wait for the tool definitions before giving up
+_TOOLS_TIMEOUT = 10
+
+@lru_cache(maxsize=8)
+def _get_tools(base_url: str) -> Dict[str, Any]:
+    """Fetch tool definitions from the API, once per base URL."""
+    response = _SESSION.get(f"{base_url}/tools", timeout=_TOOLS_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
 class StockMarketLLMClient:
     """Client for integrating stock market data with LLMs."""
     
     def __init__(self, base_url: str = "http://127.0.0.1:8001"):
         self.base_url = base_url
-        self.tools = self._get_tools()
-    
-    def _get_tools(self) -> Dict[str, Any]:
-        """Fetch tool definitions from the API."""
-        response = requests.get(f"{self.base_url}/tools")
-        response.raise_for_status()
-        return response.json()
+        self.session = _SESSION
+        self.tools = _get_tools(base_url)
     
     def get_tool_definitions(self) -> Dict[str, Any]:
         """Get tool definitions for LLM integration."""
@@ -42,23 +60,23 @@ class StockMarketLLMClient:
             if "date_lte" in arguments:
                 params["date_lte"] = arguments["date_lte"]
             
-            response = requests.get(f"{self.base_url}/api/stock-datas", params=params)
+            response = self.session.get(f"{self.base_url}/api/stock-datas", params=params)
             response.raise_for_status()
             return response.json()
             
         elif function_name == "get_latest_prices":
-            response = requests.get(f"{self.base_url}/api/latest-prices")
+            response = self.session.get(f"{self.base_url}/api/latest-prices")
             response.raise_for_status()
             return response.json()
             
         elif function_name == "get_stock_data_by_id":
             record_id = arguments["record_id"]
-            response = requests.get(f"{self.base_url}/api/stock-datas/{record_id}")
+            response = self.session.get(f"{self.base_url}/api/stock-datas/{record_id}")
             response.raise_for_status()
             return response.json()
             
         elif function_name == "get_market_overview":
-            response = requests.get(f"{self.base_url}/api/market-overview")
+            response = self.session.get(f"{self.base_url}/api/market-overview")
             response.raise_for_status()
             return response.json()
         
@@ -72,65 +90,64 @@ class StockMarketLLMClient:
             if not data:
                 return "No stock data found for the specified criteria."
             
-            formatted = f"Found {len(data)} records:\n\n"
+            parts = [f"Found {len(data)} records:\n"]
             for record in data[:5]:  # Show first 5 records
-                date = record.get("date", "Unknown")
-                formatted += f"Date: {date}\n"
-                formatted += f"  Bitcoin: ${record.get('bitcoin_price', 'N/A')}\n"
-                formatted += f"  Apple: ${record.get('apple_price', 'N/A')}\n"
-                formatted += f"  Tesla: ${record.get('tesla_price', 'N/A')}\n"
-                formatted += f"  Gold: ${record.get('gold_price', 'N/A')}\n"
-                formatted += f"  S&P 500: ${record.get('s_p_500_price', 'N/A')}\n\n"
+                parts += [
+                    f"Date: {record.get('date', 'Unknown')}",
+                    f"  Bitcoin: ${record.get('bitcoin_price', 'N/A')}",
+                    f"  Apple: ${record.get('apple_price', 'N/A')}",
+                    f"  Tesla: ${record.get('tesla_price', 'N/A')}",
+                    f"  Gold: ${record.get('gold_price', 'N/A')}",
+                    f"  S&P 500: ${record.get('s_p_500_price', 'N/A')}\n"
+                ]
             
-            if len(data) > 5:
-                formatted += f"... and {len(data) - 5} more records."
-            
-            return formatted
+            parts.append(f"... and {len(data) - 5} more records." if len(data) > 5 else "")
+            return "\n".join(parts)
             
         elif function_name == "get_latest_prices":
-            date = result.get("date", "Unknown")
-            formatted = f"Latest stock prices as of {date}:\n\n"
-            formatted += f"Bitcoin: ${result.get('bitcoin_price', 'N/A')}\n"
-            formatted += f"Ethereum: ${result.get('ethereum_price', 'N/A')}\n"
-            formatted += f"Apple: ${result.get('apple_price', 'N/A')}\n"
-            formatted += f"Tesla: ${result.get('tesla_price', 'N/A')}\n"
-            formatted += f"Microsoft: ${result.get('microsoft_price', 'N/A')}\n"
-            formatted += f"Google: ${result.get('google_price', 'N/A')}\n"
-            formatted += f"Nvidia: ${result.get('nvidia_price', 'N/A')}\n"
-            formatted += f"Gold: ${result.get('gold_price', 'N/A')}\n"
-            formatted += f"Silver: ${result.get('silver_price', 'N/A')}\n"
-            formatted += f"Crude Oil: ${result.get('crude_oil_price', 'N/A')}\n"
-            formatted += f"S&P 500: ${result.get('s_p_500_price', 'N/A')}\n"
-            formatted += f"Nasdaq 100: ${result.get('nasdaq_100_price', 'N/A')}\n"
-            
-            return formatted
+            return "\n".join([
+                f"Latest stock prices as of {result.get('date', 'Unknown')}:\n",
+                f"Bitcoin: ${result.get('bitcoin_price', 'N/A')}",
+                f"Ethereum: ${result.get('ethereum_price', 'N/A')}",
+                f"Apple: ${result.get('apple_price', 'N/A')}",
+                f"Tesla: ${result.get('tesla_price', 'N/A')}",
+                f"Microsoft: ${result.get('microsoft_price', 'N/A')}",
+                f"Google: ${result.get('google_price', 'N/A')}",
+                f"Nvidia: ${result.get('nvidia_price', 'N/A')}",
+                f"Gold: ${result.get('gold_price', 'N/A')}",
+                f"Silver: ${result.get('silver_price', 'N/A')}",
+                f"Crude Oil: ${result.get('crude_oil_price', 'N/A')}",
+                f"S&P 500: ${result.get('s_p_500_price', 'N/A')}",
+                f"Nasdaq 100: ${result.get('nasdaq_100_price', 'N/A')}",
+                ""
+            ])
             
         elif function_name == "get_stock_data_by_id":
-            date = result.get("date", "Unknown")
-            formatted = f"Stock data for record ID {result.get('id', 'Unknown')} (Date: {date}):\n\n"
-            formatted += f"Bitcoin: ${result.get('bitcoin_price', 'N/A')}\n"
-            formatted += f"Apple: ${result.get('apple_price', 'N/A')}\n"
-            formatted += f"Tesla: ${result.get('tesla_price', 'N/A')}\n"
-            formatted += f"Gold: ${result.get('gold_price', 'N/A')}\n"
-            formatted += f"S&P 500: ${result.get('s_p_500_price', 'N/A')}\n"
-            
-            return formatted
+            return "\n".join([
+                f"Stock data for record ID {result.get('id', 'Unknown')} (Date: {result.get('date', 'Unknown')}):\n",
+                f"Bitcoin: ${result.get('bitcoin_price', 'N/A')}",
+                f"Apple: ${result.get('apple_price', 'N/A')}",
+                f"Tesla: ${result.get('tesla_price', 'N/A')}",
+                f"Gold: ${result.get('gold_price', 'N/A')}",
+                f"S&P 500: ${result.get('s_p_500_price', 'N/A')}",
+                ""
+            ])
             
         elif function_name == "get_market_overview":
             latest_date = result.get("latest_date", "Unknown")
             latest_prices = result.get("latest_prices", {})
             instruments = result.get("available_instruments", [])
             
-            formatted = f"Market Overview as of {latest_date}:\n\n"
-            formatted += "Latest Prices:\n"
-            for instrument, price in latest_prices.items():
-                if price is not None:
-                    formatted += f"  {instrument.title()}: ${price}\n"
-            
-            formatted += f"\nAvailable Instruments ({len(instruments)}):\n"
-            formatted += ", ".join(instruments)
+            parts = [f"Market Overview as of {latest_date}:\n", "Latest Prices:"]
+            parts += [
+                f"  {instrument.title()}: ${price}"
+                for instrument, price in latest_prices.items()
+                if price is not None
+            ]
+            parts.append(f"\nAvailable Instruments ({len(instruments)}):")
+            parts.append(", ".join(instruments))
             
-            return formatted
+            return "\n".join(parts)
         
         else:
             return f"Function {function_name} returned: {json.dumps(result, indent=2)}"
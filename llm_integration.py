@@ -7,9 +7,14 @@
 # USAGE: Run `python llm_integration.py` in a separate terminal *after* the
 #        uvicorn server is running.
 # ==============================================================================
+import asyncio
+import httpx
 import requests
 import json
 
+# Shared session so repeated calls reuse the same keep-alive connection
+_session = requests.Session()
+
 def get_llm_tool_definition():
     """
     Fetches the GraphQL schema from the running app and formats it
@@ -22,7 +27,7 @@ def get_llm_tool_definition():
 
     try:
         # Fetch the tool definitions
-        response = requests.get(tools_url)
+        response = _session.get(tools_url)
         response.raise_for_status()  # Raise an exception for bad status codes
         
         tools = response.json()
@@ -43,6 +48,18 @@ def get_llm_tool_definition():
         print("Please ensure the uvicorn server is running (`python -m uvicorn app:app --reload --port 8001`).")
         print(f"Details: {e}")
 
+async def _fetch_endpoints(base_url):
+    """Fetch the three API endpoints concurrently"""
+    async with httpx.AsyncClient(base_url=base_url, timeout=10.0) as client:
+        responses = await asyncio.gather(
+            client.get("/api/stock-datas", params={"limit": 3}),
+            client.get("/api/latest-prices"),
+            client.get("/api/market-overview")
+        )
+    for response in responses:
+        response.raise_for_status()
+    return [response.json() for response in responses]
+
 def test_api_endpoints():
     """Test the API endpoints to ensure they're working correctly."""
     base_url = "http://127.0.0.1:8001"
@@ -50,37 +67,22 @@ def test_api_endpoints():
     print("\n--- Testing API Endpoints ---")
     
     try:
-        # Test the REST API endpoint
-        print("Testing REST API endpoint...")
-        response = requests.get(f"{base_url}/api/stock-datas?limit=3")
-        response.raise_for_status()
+        print("Testing REST API, latest prices and market overview endpoints...")
+        stock_data, latest, overview = asyncio.run(_fetch_endpoints(base_url))
         
-        result = response.json()
         print("✅ REST API endpoint working")
-        print(f"Retrieved {len(result.get('data', []))} records")
+        print(f"Retrieved {len(stock_data.get('data', []))} records")
         
-        # Test the latest prices endpoint
-        print("\nTesting latest prices endpoint...")
-        response = requests.get(f"{base_url}/api/latest-prices")
-        response.raise_for_status()
+        print("\n✅ Latest prices endpoint working")
+        print(f"Latest date: {latest.get('date', 'N/A')}")
+        print(f"Bitcoin price: ${latest.get('bitcoin_price', 'N/A')}")
+        print(f"Apple price: ${latest.get('apple_price', 'N/A')}")
         
-        result = response.json()
-        print("✅ Latest prices endpoint working")
-        print(f"Latest date: {result.get('date', 'N/A')}")
-        print(f"Bitcoin price: ${result.get('bitcoin_price', 'N/A')}")
-        print(f"Apple price: ${result.get('apple_price', 'N/A')}")
+        print("\n✅ Market overview endpoint working")
+        print(f"Latest date: {overview.get('latest_date', 'N/A')}")
+        print(f"Available instruments: {len(overview.get('available_instruments', []))}")
         
-        # Test the market overview endpoint
-        print("\nTesting market overview endpoint...")
-        response = requests.get(f"{base_url}/api/market-overview")
-        response.raise_for_status()
-        
-        result = response.json()
-        print("✅ Market overview endpoint working")
-        print(f"Latest date: {result.get('latest_date', 'N/A')}")
-        print(f"Available instruments: {len(result.get('available_instruments', []))}")
-        
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"❌ API test failed: {e}")
         print("Make sure the server is running with: python -m uvicorn app:app --reload --port 8001")
 
@@ -7,148 +7,206 @@ Uses multiple sources to get current market prices and compares with database da
 import requests
 import json
 import time
+import orjson
+import numpy as np
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, List, Optional
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional
+
+LATEST_PRICES_URL = "http://localhost:8001/api/latest-prices"
+
+# One keep-alive session and a short-lived copy of the latest-prices payload,
+# shared by get_database_prices and get_database_date
+_session = requests.Session()
+_LATEST = {"ts": 0.0, "data": None}
+
+# Symbols compared against the market and their latest-prices columns
+_SYMBOL_COL = (
+    ('AAPL', 'apple_price'),
+    ('TSLA', 'tesla_price'),
+    ('MSFT', 'microsoft_price'),
+    ('GOOGL', 'google_price'),
+    ('NVDA', 'nvidia_price'),
+    ('NFLX', 'netflix_price'),
+    ('AMZN', 'amazon_price'),
+    ('META', 'meta_price'),
+    ('SPY', 's_p_500_price'),
+    ('QQQ', 'nasdaq_100_price'),
+    ('BTC', 'bitcoin_price'),
+    ('ETH', 'ethereum_price'),
+    ('GOLD', 'gold_price'),
+    ('SILVER', 'silver_price'),
+    ('PLATINUM', 'platinum_price'),
+    ('COPPER', 'copper_price'),
+    ('OIL', 'crude_oil_price'),
+    ('NATURAL_GAS', 'natural_gas_price')
+)
+
+def _get_latest(ttl: float = 5.0) -> Dict:
+    """Fetch /api/latest-prices, reusing the parsed payload for ttl seconds"""
+    now = time.monotonic()
+    if _LATEST["data"] is not None and now - _LATEST["ts"] < ttl:
+        return _LATEST["data"]
+    
+    response = _session.get(LATEST_PRICES_URL)
+    response.raise_for_status()
+    _LATEST["data"] = orjson.loads(response.content)
+    _LATEST["ts"] = now
+    return _LATEST["data"]
 
 def get_database_prices() -> Dict[str, float]:
     """Get latest prices from our database"""
     try:
-        response = requests.get("http://localhost:8001/api/latest-prices")
-        if response.status_code == 200:
-            data = response.json()
-            
-            # Map database columns to symbols
-            price_mapping = {
-                'AAPL': data.get('apple_price'),
-                'TSLA': data.get('tesla_price'),
-                'MSFT': data.get('microsoft_price'),
-                'GOOGL': data.get('google_price'),
-                'NVDA': data.get('nvidia_price'),
-                'NFLX': data.get('netflix_price'),
-                'AMZN': data.get('amazon_price'),
-                'META': data.get('meta_price'),
-                'SPY': data.get('s_p_500_price'),
-                'QQQ': data.get('nasdaq_100_price'),
-                'BTC': data.get('bitcoin_price'),
-                'ETH': data.get('ethereum_price'),
-                'GOLD': data.get('gold_price'),
-                'SILVER': data.get('silver_price'),
-                'PLATINUM': data.get('platinum_price'),
-                'COPPER': data.get('copper_price'),
-                'OIL': data.get('crude_oil_price'),
-                'NATURAL_GAS': data.get('natural_gas_price')
-            }
-            
-            # Filter out None values
-            return {k: v for k, v in price_mapping.items() if v is not None}
-        else:
-            print(f"Error getting database prices: {response.status_code}")
-            return {}
+        data = _get_latest()
+        if data:
+            return {symbol: price for symbol, column in _SYMBOL_COL if (price := data.get(column)) is not None}
+        return {}
+    except requests.HTTPError as e:
+        print(f"Error getting database prices: {e.response.status_code}")
+        return {}
     except Exception as e:
         print(f"Error accessing database: {e}")
         return {}
 
-def get_current_prices_from_alpha_vantage() -> Dict[str, float]:
+# Demo quotes, allocated once at import and shared read-only by every comparison
+_CURRENT_PRICES = MappingProxyType({
+    'AAPL': 185.50,      # Apple Inc.
+    'TSLA': 218.75,      # Tesla Inc.
+    'MSFT': 388.25,      # Microsoft Corporation
+    'GOOGL': 142.80,     # Alphabet Inc.
+    'NVDA': 547.50,      # NVIDIA Corporation
+    'NFLX': 492.30,      # Netflix Inc.
+    'AMZN': 154.90,      # Amazon.com Inc.
+    'META': 374.60,      # Meta Platforms Inc.
+    'SPY': 4783.50,      # SPDR S&P 500 ETF
+    'QQQ': 16832.75,     # Invesco QQQ Trust
+    'BTC': 42835.00,     # Bitcoin
+    'ETH': 2524.00,      # Ethereum
+    'GOLD': 2061.25,     # Gold Futures
+    'SILVER': 23.22,     # Silver Futures
+    'PLATINUM': 921.10,  # Platinum Futures
+    'COPPER': 3.74,      # Copper Futures
+    'OIL': 72.68,        # Crude Oil Futures
+    'NATURAL_GAS': 3.31  # Natural Gas Futures
+})
+
+_MARKET_DATA = MappingProxyType({
+    'AAPL': MappingProxyType({
+        'current_price': 185.50,
+        'change': 2.15,
+        'change_pct': 1.17,
+        'volume': 45000000,
+        'market_cap': 2900000000000,
+        'trend': 'up'
+    }),
+    'TSLA': MappingProxyType({
+        'current_price': 218.75,
+        'change': -5.25,
+        'change_pct': -2.34,
+        'volume': 85000000,
+        'market_cap': 690000000000,
+        'trend': 'down'
+    }),
+    'MSFT': MappingProxyType({
+        'current_price': 388.25,
+        'change': 8.75,
+        'change_pct': 2.31,
+        'volume': 25000000,
+        'market_cap': 2900000000000,
+        'trend': 'up'
+    }),
+    'GOOGL': MappingProxyType({
+        'current_price': 142.80,
+        'change': 1.20,
+        'change_pct': 0.85,
+        'volume': 20000000,
+        'market_cap': 1800000000000,
+        'trend': 'up'
+    }),
+    'NVDA': MappingProxyType({
+        'current_price': 547.50,
+        'change': 12.50,
+        'change_pct': 2.34,
+        'volume': 35000000,
+        'market_cap': 1350000000000,
+        'trend': 'up'
+    }),
+    'NFLX': MappingProxyType({
+        'current_price': 492.30,
+        'change': -3.70,
+        'change_pct': -0.75,
+        'volume': 8000000,
+        'market_cap': 215000000000,
+        'trend': 'down'
+    }),
+    'AMZN': MappingProxyType({
+        'current_price': 154.90,
+        'change': 2.10,
+        'change_pct': 1.38,
+        'volume': 35000000,
+        'market_cap': 1600000000000,
+        'trend': 'up'
+    }),
+    'META': MappingProxyType({
+        'current_price': 374.60,
+        'change': 6.40,
+        'change_pct': 1.74,
+        'volume': 15000000,
+        'market_cap': 950000000000,
+        'trend': 'up'
+    })
+})
+
+def get_current_prices_from_alpha_vantage() -> Mapping[str, float]:
     """Get current prices from Alpha Vantage (using demo data for now)"""
     # Note: In production, you would use a real API key
     # For demonstration, we'll use realistic current prices based on recent market data
     
-    current_prices = {
-        'AAPL': 185.50,      # Apple Inc.
-        'TSLA': 218.75,      # Tesla Inc.
-        'MSFT': 388.25,      # Microsoft Corporation
-        'GOOGL': 142.80,     # Alphabet Inc.
-        'NVDA': 547.50,      # NVIDIA Corporation
-        'NFLX': 492.30,      # Netflix Inc.
-        'AMZN': 154.90,      # Amazon.com Inc.
-        'META': 374.60,      # Meta Platforms Inc.
-        'SPY': 4783.50,      # SPDR S&P 500 ETF
-        'QQQ': 16832.75,     # Invesco QQQ Trust
-        'BTC': 42835.00,     # Bitcoin
-        'ETH': 2524.00,      # Ethereum
-        'GOLD': 2061.25,     # Gold Futures
-        'SILVER': 23.22,     # Silver Futures
-        'PLATINUM': 921.10,  # Platinum Futures
-        'COPPER': 3.74,      # Copper Futures
-        'OIL': 72.68,        # Crude Oil Futures
-        'NATURAL_GAS': 3.31  # Natural Gas Futures
-    }
-    
-    return current_prices
+    return _CURRENT_PRICES
 
-def get_market_data_with_trends() -> Dict[str, Dict]:
+def get_market_data_with_trends() -> Mapping[str, Mapping]:
     """Get market data with trend information"""
     # This would normally come from a real API
     # For demonstration, we'll create realistic market data
     
-    market_data = {
-        'AAPL': {
-            'current_price': 185.50,
-            'change': 2.15,
-            'change_pct': 1.17,
-            'volume': 45000000,
-            'market_cap': 2900000000000,
-            'trend': 'up'
-        },
-        'TSLA': {
-            'current_price': 218.75,
-            'change': -5.25,
-            'change_pct': -2.34,
-            'volume': 85000000,
-            'market_cap': 690000000000,
-            'trend': 'down'
-        },
-        'MSFT': {
-            'current_price': 388.25,
-            'change': 8.75,
-            'change_pct': 2.31,
-            'volume': 25000000,
-            'market_cap': 2900000000000,
-            'trend': 'up'
-        },
-        'GOOGL': {
-            'current_price': 142.80,
-            'change': 1.20,
-            'change_pct': 0.85,
-            'volume': 20000000,
-            'market_cap': 1800000000000,
-            'trend': 'up'
-        },
-        'NVDA': {
-            'current_price': 547.50,
-            'change': 12.50,
-            'change_pct': 2.34,
-            'volume': 35000000,
-            'market_cap': 1350000000000,
-            'trend': 'up'
-        },
-        'NFLX': {
-            'current_price': 492.30,
-            'change': -3.70,
-            'change_pct': -0.75,
-            'volume': 8000000,
-            'market_cap': 215000000000,
-            'trend': 'down'
-        },
-        'AMZN': {
-            'current_price': 154.90,
-            'change': 2.10,
-            'change_pct': 1.38,
-            'volume': 35000000,
-            'market_cap': 1600000000000,
-            'trend': 'up'
-        },
-        'META': {
-            'current_price': 374.60,
-            'change': 6.40,
-            'change_pct': 1.74,
-            'volume': 15000000,
-            'market_cap': 950000000000,
-            'trend': 'up'
-        }
-    }
+    return _MARKET_DATA
+
+# Glyphs indexed by _classify_moves: 0 = down, 1 = flat, 2 = up
+_TREND_GLYPHS = np.array(["📉", "➡️", "📈"], dtype=object)
+_SENTIMENTS = ("🔴 Bearish", "🟡 Neutral", "🟢 Bullish")
+_TECH = frozenset({'AAPL', 'MSFT', 'GOOGL', 'NVDA', 'META'})
+
+def _classify_moves(change_pct: np.ndarray) -> np.ndarray:
+    """Bucket percentage moves beyond +/-1% into down/flat/up indexes"""
+    return np.select([change_pct > 1, change_pct < -1], [2, 0], default=1)
+
+@dataclass
+class PriceComparison:
+    """Struct-of-arrays view of the symbols priced by both sources"""
+    symbols: np.ndarray
+    db: np.ndarray
+    cur: np.ndarray
+    intraday_change: np.ndarray
+    intraday_pct: np.ndarray
+    volume: np.ndarray
+
+def build_price_comparison(database_prices: Dict[str, float], current_prices: Dict[str, float],
+                           market_data: Dict[str, Dict]) -> PriceComparison:
+    """Align database, current and market data into parallel arrays"""
+    symbols = [symbol for symbol, db_price in database_prices.items()
+               if db_price and current_prices.get(symbol)]
+    count = len(symbols)
+    market_info = [market_data.get(symbol, {}) for symbol in symbols]
     
-    return market_data
+    return PriceComparison(
+        symbols=np.array(symbols, dtype=object),
+        db=np.fromiter((database_prices[s] for s in symbols), dtype=np.float64, count=count),
+        cur=np.fromiter((current_prices[s] for s in symbols), dtype=np.float64, count=count),
+        intraday_change=np.fromiter((i.get('change', 0) for i in market_info), dtype=np.float64, count=count),
+        intraday_pct=np.fromiter((i.get('change_pct', 0) for i in market_info), dtype=np.float64, count=count),
+        volume=np.fromiter((i.get('volume', 0) for i in market_info), dtype=np.int64, count=count)
+    )
 
 def compare_prices_with_analysis(database_prices: Dict[str, float], current_prices: Dict[str, float]) -> None:
     """Compare prices with detailed analysis"""
@@ -156,101 +214,69 @@ def compare_prices_with_analysis(database_prices: Dict[str, float], current_pric
     print("📊 COMPREHENSIVE PRICE COMPARISON: DATABASE vs CURRENT MARKET")
     print("="*90)
     
-    comparison_data = []
-    market_data = get_market_data_with_trends()
+    comparison = build_price_comparison(database_prices, current_prices, get_market_data_with_trends())
+    symbols, volume = comparison.symbols, comparison.volume
+    change = comparison.cur - comparison.db
+    change_pct = change / comparison.db * 100  # db prices are non-zero by construction
     
-    for symbol in database_prices.keys():
-        db_price = database_prices.get(symbol)
-        current_price = current_prices.get(symbol)
-        
-        if db_price and current_price:
-            change = current_price - db_price
-            change_pct = (change / db_price) * 100 if db_price != 0 else 0
-            
-            # Get additional market data if available
-            market_info = market_data.get(symbol, {})
-            intraday_change = market_info.get('change', 0)
-            intraday_pct = market_info.get('change_pct', 0)
-            volume = market_info.get('volume', 0)
-            trend = market_info.get('trend', 'neutral')
-            
-            comparison_data.append({
-                'symbol': symbol,
-                'database_price': db_price,
-                'current_price': current_price,
-                'change': change,
-                'change_pct': change_pct,
-                'intraday_change': intraday_change,
-                'intraday_pct': intraday_pct,
-                'volume': volume,
-                'trend': trend
-            })
-            
-            # Determine trend emoji
-            if change_pct > 1:
-                trend_emoji = "📈"
-            elif change_pct < -1:
-                trend_emoji = "📉"
-            else:
-                trend_emoji = "➡️"
-            
-            # Format volume for display
-            if volume > 1000000:
-                volume_str = f"{volume/1000000:.1f}M"
-            else:
-                volume_str = f"{volume:,}"
-            
-            print(f"{trend_emoji} {symbol:6} | DB: ${db_price:8.2f} | Current: ${current_price:8.2f} | Change: ${change:+8.2f} ({change_pct:+6.2f}%) | Intraday: ${intraday_change:+6.2f} ({intraday_pct:+5.2f}%) | Vol: {volume_str}")
+    # Trend glyphs and volume labels for every row at once
+    trend_emoji = _TREND_GLYPHS[_classify_moves(change_pct)]
+    volume_str = [f"{v / 1000000:.1f}M" if v > 1000000 else f"{v:,}" for v in volume.tolist()]
+    
+    # Rows follow database order; symbols without a current price are marked unknown
+    rows = []
+    i = 0
+    for symbol, db_price in database_prices.items():
+        if i < symbols.size and symbols[i] == symbol:
+            rows.append(f"{trend_emoji[i]} {symbol:6} | DB: ${comparison.db[i]:8.2f} | Current: ${comparison.cur[i]:8.2f} | Change: ${change[i]:+8.2f} ({change_pct[i]:+6.2f}%) | Intraday: ${comparison.intraday_change[i]:+6.2f} ({comparison.intraday_pct[i]:+5.2f}%) | Vol: {volume_str[i]}")
+            i += 1
         
         elif db_price:
-            print(f"❓ {symbol:6} | DB: ${db_price:8.2f} | Current: {'N/A':>8} | Change: {'N/A':>8} | Intraday: {'N/A':>8} | Vol: {'N/A':>8}")
+            rows.append(f"❓ {symbol:6} | DB: ${db_price:8.2f} | Current: {'N/A':>8} | Change: {'N/A':>8} | Intraday: {'N/A':>8} | Vol: {'N/A':>8}")
+    
+    if rows:
+        print("\n".join(rows))
     
     # Detailed analysis
-    if comparison_data:
+    if symbols.size:
         print("\n" + "-"*90)
         print("📈 DETAILED MARKET ANALYSIS")
         print("-"*90)
         
         # Overall statistics
-        total_change = sum(item['change'] for item in comparison_data)
-        avg_change_pct = sum(item['change_pct'] for item in comparison_data) / len(comparison_data)
+        total_change = change.sum()
+        avg_change_pct = change_pct.mean()
         
-        up_count = sum(1 for item in comparison_data if item['change'] > 0)
-        down_count = sum(1 for item in comparison_data if item['change'] < 0)
-        flat_count = len(comparison_data) - up_count - down_count
+        up_count = int((change > 0).sum())
+        down_count = int((change < 0).sum())
+        flat_count = symbols.size - up_count - down_count
         
         print(f"📊 Total Portfolio Change: ${total_change:+.2f}")
         print(f"📊 Average Change: {avg_change_pct:+.2f}%")
         print(f"📈 Up: {up_count}, 📉 Down: {down_count}, ➡️ Flat: {flat_count}")
         
         # Most volatile symbols
-        volatile_symbols = sorted(comparison_data, key=lambda x: abs(x['change_pct']), reverse=True)[:5]
+        volatile_idx = np.argsort(-np.abs(change_pct), kind='stable')[:5]
         print(f"\n🔥 Most Volatile (by % change):")
-        for item in volatile_symbols:
-            print(f"   {item['symbol']}: {item['change_pct']:+.2f}% (${item['change']:+.2f})")
+        for j in volatile_idx:
+            print(f"   {symbols[j]}: {change_pct[j]:+.2f}% (${change[j]:+.2f})")
         
         # Best and worst performers
-        best_performer = max(comparison_data, key=lambda x: x['change_pct'])
-        worst_performer = min(comparison_data, key=lambda x: x['change_pct'])
+        best = int(change_pct.argmax())
+        worst = int(change_pct.argmin())
         
-        print(f"\n🏆 Best Performer: {best_performer['symbol']} (+{best_performer['change_pct']:.2f}%)")
-        print(f"📉 Worst Performer: {worst_performer['symbol']} ({worst_performer['change_pct']:+.2f}%)")
+        print(f"\n🏆 Best Performer: {symbols[best]} (+{change_pct[best]:.2f}%)")
+        print(f"📉 Worst Performer: {symbols[worst]} ({change_pct[worst]:+.2f}%)")
         
         # Market sentiment
-        if avg_change_pct > 1:
-            sentiment = "🟢 Bullish"
-        elif avg_change_pct < -1:
-            sentiment = "🔴 Bearish"
-        else:
-            sentiment = "🟡 Neutral"
+        sentiment = _SENTIMENTS[int(_classify_moves(avg_change_pct))]
         
         print(f"\n📊 Market Sentiment: {sentiment}")
         
         # Sector analysis
-        tech_stocks = ['AAPL', 'MSFT', 'GOOGL', 'NVDA', 'META']
-        tech_changes = [item['change_pct'] for item in comparison_data if item['symbol'] in tech_stocks]
-        if tech_changes:
-            avg_tech_change = sum(tech_changes) / len(tech_changes)
+        tech_mask = np.fromiter((symbol in _TECH for symbol in symbols), dtype=bool, count=symbols.size)
+        if tech_mask.any():
+            avg_tech_change = change_pct[tech_mask].mean()
             print(f"💻 Tech Sector Average: {avg_tech_change:+.2f}%")
         
         # Data freshness
@@ -269,23 +295,21 @@ def compare_prices_with_analysis(database_prices: Dict[str, float], current_pric
             print("   • Significant market decline")
         
         # Risk assessment
-        high_volatility = [item for item in comparison_data if abs(item['change_pct']) > 5]
+        high_volatility = int((np.abs(change_pct) > 5).sum())
         if high_volatility:
-            print(f"   • {len(high_volatility)} symbols showing high volatility (>5%)")
+            print(f"   • {high_volatility} symbols showing high volatility (>5%)")
         
         # Volume analysis
-        high_volume = [item for item in comparison_data if item['volume'] > 50000000]
+        high_volume = int((volume > 50000000).sum())
         if high_volume:
-            print(f"   • {len(high_volume)} symbols with high trading volume")
+            print(f"   • {high_volume} symbols with high trading volume")
 
 def get_database_date() -> str:
     """Get the date of the database data"""
     try:
-        response = requests.get("http://localhost:8001/api/latest-prices")
-        if response.status_code == 200:
-            data = response.json()
-            if 'date' in data:
-                return data['date']
+        data = _get_latest()
+        if 'date' in data:
+            return data['date']
         return "Unknown"
     except:
         return "Unknown"
@@ -3,9 +3,30 @@
 Test script for the Unified Stock Market Analysis Platform
 """
 
+import asyncio
+import httpx
 import requests
 import json
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# HTTP/2 needs the optional h2 package; fall back to HTTP/1.1 without it
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+# requests.Session is not thread-safe, so each worker thread keeps its own
+_thread_local = threading.local()
+
+def _get(url, **kwargs):
+    """GET through the calling thread's keep-alive session"""
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = _thread_local.session = requests.Session()
+    return session.get(url, **kwargs)
 
 def test_api_endpoints():
     """Test all API endpoints"""
@@ -14,10 +35,18 @@ def test_api_endpoints():
     print("🧪 Testing Unified Stock Market Analysis Platform")
     print("=" * 60)
     
+    # Issue all six requests at once; results are reported in order below
+    paths = ("/", "/api/latest-prices", "/api/market-overview",
+             "/api/historical-analysis?symbol=AAPL&days=7", "/tools", "/api/stock-datas?limit=5")
+    with ThreadPoolExecutor(max_workers=len(paths)) as executor:
+        root_f, latest_f, overview_f, historical_f, tools_f, stock_datas_f = (
+            executor.submit(_get, f"{base_url}{path}") for path in paths
+        )
+    
     # Test 1: Root endpoint
     print("\n1️⃣ Testing root endpoint...")
     try:
-        response = requests.get(f"{base_url}/")
+        response = root_f.result()
         if response.status_code == 200:
             data = response.json()
             print(f"✅ Root endpoint working")
@@ -31,7 +60,7 @@ def test_api_endpoints():
     # Test 2: Latest prices
     print("\n2️⃣ Testing latest prices...")
     try:
-        response = requests.get(f"{base_url}/api/latest-prices")
+        response = latest_f.result()
         if response.status_code == 200:
             data = response.json()
             print(f"✅ Latest prices working")
@@ -46,7 +75,7 @@ def test_api_endpoints():
     # Test 3: Market overview
     print("\n3️⃣ Testing market overview...")
     try:
-        response = requests.get(f"{base_url}/api/market-overview")
+        response = overview_f.result()
         if response.status_code == 200:
             data = response.json()
             print(f"✅ Market overview working")
@@ -60,7 +89,7 @@ def test_api_endpoints():
     # Test 4: Historical analysis
     print("\n4️⃣ Testing historical analysis...")
     try:
-        response = requests.get(f"{base_url}/api/historical-analysis?symbol=AAPL&days=7")
+        response = historical_f.result()
         if response.status_code == 200:
             data = response.json()
             print(f"✅ Historical analysis working")
@@ -76,7 +105,7 @@ def test_api_endpoints():
     # Test 5: LLM tools
     print("\n5️⃣ Testing LLM tools...")
     try:
-        response = requests.get(f"{base_url}/tools")
+        response = tools_f.result()
         if response.status_code == 200:
             data = response.json()
             tools = data.get('tools', [])
@@ -93,7 +122,7 @@ def test_api_endpoints():
     # Test 6: Stock data with filters
     print("\n6️⃣ Testing stock data with filters...")
     try:
-        response = requests.get(f"{base_url}/api/stock-datas?limit=5")
+        response = stock_datas_f.result()
         if response.status_code == 200:
             data = response.json()
             print(f"✅ Stock data working")
@@ -104,6 +133,17 @@ def test_api_endpoints():
     except Exception as e:
         print(f"❌ Stock data error: {e}")
 
+async def _fetch_symbols(base_url, symbols):
+    """Fetch 30-day historical analysis for every symbol concurrently"""
+    async def fetch(client, symbol):
+        try:
+            return symbol, await client.get("/api/historical-analysis", params={"symbol": symbol, "days": 30})
+        except Exception as e:
+            return symbol, e
+    
+    async with httpx.AsyncClient(base_url=base_url, timeout=10.0, http2=_HTTP2_AVAILABLE) as client:
+        return await asyncio.gather(*(fetch(client, symbol) for symbol in symbols))
+
 def test_multiple_symbols():
     """Test historical analysis for multiple symbols"""
     base_url = "http://localhost:8001"
@@ -113,9 +153,10 @@ def test_multiple_symbols():
     
     symbols = ["AAPL", "TSLA", "MSFT", "GOOGL", "BTC", "GOLD"]
     
-    for symbol in symbols:
+    for symbol, response in asyncio.run(_fetch_symbols(base_url, symbols)):
         try:
-            response = requests.get(f"{base_url}/api/historical-analysis?symbol={symbol}&days=30")
+            if isinstance(response, Exception):
+                raise response
             if response.status_code == 200:
                 data = response.json()
                 price_change = data.get('price_change_pct', 0)
@@ -126,6 +167,60 @@ def test_multiple_symbols():
         except Exception as e:
             print(f"❌ {symbol}: Error - {e}")
 
+def test_snapshot_paging_and_etags():
+    """Test the batched snapshot, keyset paging and conditional GET"""
+    base_url = "http://localhost:8001"
+    
+    print("\n🔁 Testing Snapshot, Paging and ETags")
+    print("=" * 40)
+    
+    # Snapshot: one entry per requested symbol, each with the summary fields
+    try:
+        symbols = ["AAPL", "TSLA", "BTC"]
+        response = _get(f"{base_url}/api/snapshot?symbols={','.join(symbols)}&days=30")
+        assert response.status_code == 200, f"status {response.status_code}"
+        data = response.json()
+        assert data["analysis_period_days"] == 30, data["analysis_period_days"]
+        assert list(data["symbols"]) == symbols, list(data["symbols"])
+        for symbol, stats in data["symbols"].items():
+            assert stats is not None, f"{symbol} has no data"
+            missing = {"as_of", "current_price", "price_change_pct", "volatility", "data_points"} - stats.keys()
+            assert not missing, f"{symbol} missing {sorted(missing)}"
+            assert 0 < stats["data_points"] <= 30, f"{symbol} has {stats['data_points']} points"
+        print(f"✅ Snapshot working ({len(symbols)} symbols)")
+    
+        response = _get(f"{base_url}/api/snapshot?symbols=AAPL,XXX")
+        assert response.status_code == 400, f"unsupported symbol gave {response.status_code}"
+        print("✅ Snapshot rejects unsupported symbols")
+    except Exception as e:
+        print(f"❌ Snapshot error: {e}")
+    
+    # Keyset paging: the second page starts after the first page's cursor
+    try:
+        first = _get(f"{base_url}/api/stock-datas?limit=5&after_id=0").json()
+        second = _get(f"{base_url}/api/stock-datas?limit=5&after_id={first['next_cursor']}").json()
+        first_ids = [row["id"] for row in first["data"]]
+        second_ids = [row["id"] for row in second["data"]]
+        assert len(first_ids) == 5 and first["next_cursor"] == first_ids[-1], first
+        assert not set(first_ids) & set(second_ids), f"pages overlap: {first_ids} / {second_ids}"
+        assert second_ids == sorted(second_ids) and second_ids[0] > first_ids[-1], second_ids
+        print(f"✅ Keyset paging working (ids {first_ids[0]}-{first_ids[-1]}, then {second_ids[0]}-{second_ids[-1]})")
+    except Exception as e:
+        print(f"❌ Keyset paging error: {e}")
+    
+    # Conditional GET: repeating a request with its ETag returns 304
+    for path in ("/api/latest-prices", "/api/market-overview"):
+        try:
+            response = _get(f"{base_url}{path}")
+            etag = response.headers.get("ETag")
+            assert response.status_code == 200 and etag, f"status {response.status_code}, ETag {etag}"
+            repeat = _get(f"{base_url}{path}", headers={"If-None-Match": etag})
+            assert repeat.status_code == 304, f"repeat gave {repeat.status_code}"
+            assert repeat.headers.get("ETag") == etag and not repeat.content, repeat.headers
+            print(f"✅ {path} returns 304 for a matching ETag")
+        except Exception as e:
+            print(f"❌ {path} conditional GET error: {e}")
+
 def test_llm_integration_example():
     """Example of how to use the API with LLMs"""
     print("\n🤖 LLM Integration Example")
@@ -178,6 +273,7 @@ def main():
     # Run tests
     test_api_endpoints()
     test_multiple_symbols()
+    test_snapshot_paging_and_etags()
     test_llm_integration_example()
     
     print("\n" + "=" * 60)
@@ -10,38 +10,56 @@
 # - Web UI: Run `python unified_app.py` and visit the Gradio interface
 # ==============================================================================
 
-import gradio as gr
 import requests
-import json
+import httpx
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
 import os
 import asyncio
+import weakref
+import random
+import hashlib
+import numpy as np
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Tuple
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, List, Any, Optional, Tuple
 from dotenv import load_dotenv
+from cachetools import TTLCache
 import time
-import re
-from collections import Counter
 import threading
 import queue
 import uuid
 import sqlalchemy as sa
-from sqlalchemy.orm import declarative_base, sessionmaker
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from fastapi import FastAPI, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncConnection
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
+from fastapi.middleware.gzip import GZipMiddleware
 
-# Import Consilium components
-try:
-    from gradio_consilium_roundtable import consilium_roundtable
-    from smolagents import CodeAgent, DuckDuckGoSearchTool, FinalAnswerTool, InferenceClientModel, VisitWebpageTool, Tool
-    from research_tools import EnhancedResearchAgent
-    from enhanced_search_functions import ENHANCED_SEARCH_FUNCTIONS
-    CONSILIUM_AVAILABLE = True
-except ImportError as e:
-    print(f"Warning: Consilium components not available: {e}")
-    CONSILIUM_AVAILABLE = False
+# Gradio is imported only when the web UI is built, keeping API-only startup light
+if TYPE_CHECKING:
+    import gradio as gr
+
+# Consilium components are imported on first use by the web UI, so API-only
+# processes never pay for smolagents and the research tools
+CONSILIUM_AVAILABLE = None
+
+def _load_consilium() -> bool:
+    """Import the Consilium components once and report whether they are available"""
+    global CONSILIUM_AVAILABLE, consilium_roundtable, CodeAgent, DuckDuckGoSearchTool, FinalAnswerTool
+    global InferenceClientModel, VisitWebpageTool, Tool, EnhancedResearchAgent, ENHANCED_SEARCH_FUNCTIONS
+    if CONSILIUM_AVAILABLE is None:
+        try:
+            from gradio_consilium_roundtable import consilium_roundtable
+            from smolagents import CodeAgent, DuckDuckGoSearchTool, FinalAnswerTool, InferenceClientModel, VisitWebpageTool, Tool
+            from research_tools import EnhancedResearchAgent
+            from enhanced_search_functions import ENHANCED_SEARCH_FUNCTIONS
+            CONSILIUM_AVAILABLE = True
+        except ImportError as e:
+            print(f"Warning: Consilium components not available: {e}")
+            CONSILIUM_AVAILABLE = False
+    return CONSILIUM_AVAILABLE
 
 # Load environment variables
 load_dotenv()
@@ -50,70 +68,40 @@ load_dotenv()
 # ENRICH MCP DATABASE SETUP
 # ==============================================================================
 
-# Database URL for SQLite (async version)
-DATABASE_URL = "sqlite+aiosqlite:///stock_market.db"
+from database import StockData, get_conn, stream_json_rows
 
-# Create an async engine
-engine = create_async_engine(DATABASE_URL, echo=False)
+# Column names resolved once at import
+_COLUMN_NAMES = tuple(column.name for column in StockData.__table__.columns)
 
-# Create a session factory for creating async sessions
-async_session_factory = sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
-)
+# Fixed-shape statements built once; per-request values travel as bound parameters
+_SELECT_LATEST = sa.select(StockData.__table__).order_by(StockData.date.desc()).limit(1)
+_SELECT_BY_ID = sa.select(StockData.__table__).where(StockData.id == sa.bindparam("record_id"))
 
-# Define the base for our ORM models
-Base = declarative_base()
+# Numeric metrics summarised by /api/market-overview
+_STAT_COLUMNS = tuple(name for name in _COLUMN_NAMES if name not in ('id', 'date'))
 
-# --- ORM Model Definition ---
-def create_stock_orm_model():
-    """Creates the SQLAlchemy ORM model for stock data."""
-    class StockData(Base):
-        __tablename__ = 'stock_data'
-        
-        # Define all columns
-        id = sa.Column(sa.Integer, primary_key=True)
-        date = sa.Column(sa.DateTime)
-        natural_gas_price = sa.Column(sa.Float)
-        natural_gas_vol = sa.Column(sa.Float)
-        crude_oil_price = sa.Column(sa.Float)
-        crude_oil_vol = sa.Column(sa.Float)
-        copper_price = sa.Column(sa.Float)
-        copper_vol = sa.Column(sa.Float)
-        bitcoin_price = sa.Column(sa.Float)
-        bitcoin_vol = sa.Column(sa.Float)
-        platinum_price = sa.Column(sa.Float)
-        platinum_vol = sa.Column(sa.Float)
-        ethereum_price = sa.Column(sa.Float)
-        ethereum_vol = sa.Column(sa.Float)
-        s_p_500_price = sa.Column(sa.Float)
-        nasdaq_100_price = sa.Column(sa.Float)
-        nasdaq_100_vol = sa.Column(sa.Float)
-        apple_price = sa.Column(sa.Float)
-        apple_vol = sa.Column(sa.Float)
-        tesla_price = sa.Column(sa.Float)
-        tesla_vol = sa.Column(sa.Float)
-        microsoft_price = sa.Column(sa.Float)
-        microsoft_vol = sa.Column(sa.Float)
-        silver_price = sa.Column(sa.Float)
-        silver_vol = sa.Column(sa.Float)
-        google_price = sa.Column(sa.Float)
-        google_vol = sa.Column(sa.Float)
-        nvidia_price = sa.Column(sa.Float)
-        nvidia_vol = sa.Column(sa.Float)
-        berkshire_price = sa.Column(sa.Integer)
-        berkshire_vol = sa.Column(sa.Float)
-        netflix_price = sa.Column(sa.Float)
-        netflix_vol = sa.Column(sa.Float)
-        amazon_price = sa.Column(sa.Float)
-        amazon_vol = sa.Column(sa.Float)
-        meta_price = sa.Column(sa.Float)
-        meta_vol = sa.Column(sa.Float)
-        gold_price = sa.Column(sa.Float)
-        gold_vol = sa.Column(sa.Float)
-    
-    return StockData
-
-StockData = create_stock_orm_model()
+# Symbols accepted by /api/historical-analysis and their price columns
+_SYMBOL_COL = MappingProxyType({
+    'AAPL': StockData.apple_price,
+    'TSLA': StockData.tesla_price,
+    'MSFT': StockData.microsoft_price,
+    'GOOGL': StockData.google_price,
+    'NVDA': StockData.nvidia_price,
+    'BRK': StockData.berkshire_price,
+    'NFLX': StockData.netflix_price,
+    'AMZN': StockData.amazon_price,
+    'META': StockData.meta_price,
+    'SPY': StockData.s_p_500_price,
+    'QQQ': StockData.nasdaq_100_price,
+    'BTC': StockData.bitcoin_price,
+    'ETH': StockData.ethereum_price,
+    'GOLD': StockData.gold_price,
+    'SILVER': StockData.silver_price,
+    'PLATINUM': StockData.platinum_price,
+    'COPPER': StockData.copper_price,
+    'OIL': StockData.crude_oil_price,
+    'NATURAL_GAS': StockData.natural_gas_price
+})
 
 # ==============================================================================
 # FASTAPI APP SETUP
@@ -122,7 +110,8 @@ StockData = create_stock_orm_model()
 app = FastAPI(
     title="Unified Stock Market Analysis Platform",
     description="Combines enrich MCP API with Consilium MCP visual consensus engine for comprehensive financial analysis.",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -134,26 +123,86 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Numeric JSON compresses several-fold; small payloads are sent as-is
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # ==============================================================================
 # ENRICH MCP REST API ENDPOINTS
 # ==============================================================================
 
-async def get_session() -> AsyncSession:
-    """FastAPI dependency to provide a DB session for each request."""
-    async with async_session_factory() as session:
-        yield session
+# Responses only change when new data is ingested. Latest-row views expire
+# quickly; per-symbol history windows are kept for five minutes.
+_response_cache = TTLCache(maxsize=8, ttl=30)
+_history_cache = TTLCache(maxsize=256, ttl=300)
+# One lock per key, so concurrent misses for a key share a single build while
+# other keys refresh independently; unused locks are dropped automatically
+_cache_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+async def _cached_response(key: str, build, cache: TTLCache = _response_cache):
+    """Return the cached response for key, building it once on a miss."""
+    response = cache.get(key)
+    if response is None:
+        lock = _cache_locks.get(key)
+        if lock is None:
+            lock = _cache_locks[key] = asyncio.Lock()
+        async with lock:
+            response = cache.get(key)
+            if response is None:
+                response = await build()
+                cache[key] = response
+    return response
+
+# Newest date and row count; both only change when data is ingested
+_DATA_VERSION = sa.select(sa.func.max(StockData.date), sa.func.count()).select_from(StockData.__table__)
+
+# Sent on both the 200 and the 304, so a revalidated copy gets a fresh max-age
+_CONDITIONAL_CACHE_CONTROL = "private, max-age=30"
+
+async def _encode_with_etag(key: str, conn: AsyncConnection, build) -> Tuple[bytes, str]:
+    """Build a response once and keep its JSON body alongside a data-version ETag.
+
+    The tag hashes the newest date and the row count rather than the body, so
+    it survives cache rebuilds (and the overview's analysis_date) until new
+    data arrives. It is weak because the body bytes may still differ.
+    """
+    body = orjson.dumps(await build(), option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    latest, rows = (await conn.execute(_DATA_VERSION)).one()
+    digest = hashlib.blake2b(f"{key}|{latest}|{rows}".encode(), digest_size=8).hexdigest()
+    return body, f'W/"{digest}"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match list (or *) against our ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+async def _conditional_response(request: Request, key: str, conn: AsyncConnection, build) -> Response:
+    """Serve a cached JSON body, or 304 when the client already holds it."""
+    body, etag = await _cached_response(key, lambda: _encode_with_etag(key, conn, build))
+    headers = {"ETag": etag, "Cache-Control": _CONDITIONAL_CACHE_CONTROL}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @app.get("/api/stock-datas")
 async def get_stock_datas(
-    limit: int = 100,
-    offset: int = 0,
+    limit: int = Query(100, gt=0, le=1000),
+    offset: int = Query(0, ge=0),
     date_eq: Optional[str] = None,
     date_gte: Optional[str] = None,
     date_lte: Optional[str] = None,
-    session: AsyncSession = Depends(get_session)
+    after_id: Optional[int] = None
 ):
-    """REST endpoint to get stock data with filtering"""
-    query = sa.select(StockData)
+    """REST endpoint to get stock data with filtering.
+
+    Pass the previous page's next_cursor as after_id to page by primary key
+    instead of OFFSET, which keeps deep pages a single index seek.
+    """
+    # Core select returns plain rows, skipping ORM instance hydration
+    query = sa.select(StockData.__table__)
     
     # Apply filters
     if date_eq:
@@ -164,202 +213,237 @@ async def get_stock_datas(
         query = query.where(StockData.date <= date_lte)
     
     # Apply pagination
-    query = query.limit(limit).offset(offset)
-    
-    result = await session.execute(query)
-    records = result.scalars().all()
-    
-    # Convert to dict
-    data = []
-    for record in records:
-        record_dict = {}
-        for column in StockData.__table__.columns:
-            value = getattr(record, column.name)
-            if isinstance(value, datetime):
-                value = value.isoformat()
-            record_dict[column.name] = value
-        data.append(record_dict)
+    if after_id is not None:
+        query = query.where(StockData.id > after_id).order_by(StockData.id).limit(limit)
+        rows = stream_json_rows(query, cursor_column="id")
+    else:
+        rows = stream_json_rows(query.limit(limit).offset(offset))
     
-    return {"data": data, "total": len(data)}
+    # Stream rows in batches so large pages never sit in memory at once
+    return StreamingResponse(rows, media_type="application/json")
 
 @app.get("/api/stock-datas/{record_id}")
 async def get_stock_data_by_id(
     record_id: int,
-    session: AsyncSession = Depends(get_session)
+    conn: AsyncConnection = Depends(get_conn)
 ):
     """REST endpoint to get a single stock data record by ID"""
-    result = await session.execute(
-        sa.select(StockData).where(StockData.id == record_id)
-    )
-    record = result.scalar_one_or_none()
+    result = await conn.execute(_SELECT_BY_ID, {"record_id": record_id})
+    record = result.mappings().first()
     
     if not record:
         raise HTTPException(status_code=404, detail="Record not found")
     
-    # Convert to dict
-    record_dict = {}
-    for column in StockData.__table__.columns:
-        value = getattr(record, column.name)
-        if isinstance(value, datetime):
-            value = value.isoformat()
-        record_dict[column.name] = value
-    
-    return record_dict
+    # orjson encodes the datetime column natively
+    return dict(record)
 
-@app.get("/api/latest-prices")
-async def get_latest_prices(session: AsyncSession = Depends(get_session)):
-    """REST endpoint to get the latest stock prices"""
-    result = await session.execute(
-        sa.select(StockData).order_by(StockData.date.desc()).limit(1)
-    )
-    record = result.scalar_one_or_none()
+async def _latest_prices(conn: AsyncConnection) -> Dict[str, Any]:
+    """Build the latest-prices response from the newest row"""
+    result = await conn.execute(_SELECT_LATEST)
+    record = result.mappings().first()
     
     if not record:
         raise HTTPException(status_code=404, detail="No data available")
     
-    # Convert to dict
-    record_dict = {}
-    for column in StockData.__table__.columns:
-        value = getattr(record, column.name)
-        if isinstance(value, datetime):
-            value = value.isoformat()
-        record_dict[column.name] = value
-    
-    return record_dict
+    return dict(record)
 
-@app.get("/api/market-overview")
-async def get_market_overview(session: AsyncSession = Depends(get_session)):
-    """Get a market overview with latest prices and basic statistics"""
-    # Get latest prices
-    result = await session.execute(
-        sa.select(StockData).order_by(StockData.date.desc()).limit(1)
+@app.get("/api/latest-prices")
+async def get_latest_prices(request: Request, conn: AsyncConnection = Depends(get_conn)):
+    """REST endpoint to get the latest stock prices"""
+    return await _conditional_response(request, "latest", conn, lambda: _latest_prices(conn))
+
+def _overview_stats_query(window: int = 30):
+    """One aggregate SELECT producing latest/avg/min/max for every metric over the last window rows"""
+    recent = (
+        sa.select(StockData.__table__)
+        .order_by(StockData.date.desc())
+        .limit(window)
+        .cte("recent")
     )
-    latest = result.scalar_one_or_none()
+    columns = []
+    for name in _STAT_COLUMNS:
+        col = recent.c[name]
+        columns += [
+            sa.func.count(col).label(f"{name}_n"),
+            sa.select(col).where(col.isnot(None)).order_by(recent.c.date.desc())
+            .limit(1).scalar_subquery().label(f"{name}_latest"),
+            sa.func.avg(col, type_=sa.Float).label(f"{name}_avg"),
+            sa.func.min(col).label(f"{name}_min"),
+            sa.func.max(col).label(f"{name}_max"),
+        ]
+    return sa.select(*columns).select_from(recent)
+
+# Latest row and window statistics in one round trip: both derived tables
+# yield a single row, so the cross join is empty only when the table is.
+# Built once at import; the statement has no per-request parameters.
+_latest_row = _SELECT_LATEST.subquery("latest")
+_window_stats = _overview_stats_query().subquery("stats")
+_OVERVIEW = sa.select(_latest_row, _window_stats).select_from(
+    _latest_row.join(_window_stats, sa.true())
+)
+
+async def _market_overview(conn: AsyncConnection) -> Dict[str, Any]:
+    """Build the market overview with latest prices and 30-day statistics"""
+    # SQLite aggregates the last 30 rows instead of them being looped over here
+    row = (await conn.execute(_OVERVIEW)).mappings().first()
     
-    if not latest:
+    if not row:
         raise HTTPException(status_code=404, detail="No data available")
     
-    # Get some basic statistics
-    result = await session.execute(
-        sa.select(StockData).order_by(StockData.date.desc()).limit(30)
-    )
-    recent_data = result.scalars().all()
-    
-    # Calculate basic stats
-    stats = {}
-    for column in StockData.__table__.columns:
-        if column.name in ['id', 'date']:
-            continue
-        
-        values = [getattr(record, column.name) for record in recent_data if getattr(record, column.name) is not None]
-        if values:
-            stats[column.name] = {
-                "latest": values[0],
-                "avg_30d": sum(values) / len(values),
-                "min_30d": min(values),
-                "max_30d": max(values)
-            }
-    
-    # Convert latest to dict
-    latest_dict = {}
-    for column in StockData.__table__.columns:
-        value = getattr(latest, column.name)
-        if isinstance(value, datetime):
-            value = value.isoformat()
-        latest_dict[column.name] = value
+    stats = {
+        name: {
+            "latest": row[f"{name}_latest"],
+            "avg_30d": row[f"{name}_avg"],
+            "min_30d": row[f"{name}_min"],
+            "max_30d": row[f"{name}_max"]
+        }
+        for name in _STAT_COLUMNS if row[f"{name}_n"]
+    }
     
     return {
-        "latest_prices": latest_dict,
+        "latest_prices": {name: row[name] for name in _COLUMN_NAMES},
         "statistics": stats,
         "analysis_date": datetime.now().isoformat()
     }
 
-@app.get("/api/historical-analysis")
-async def get_historical_analysis(
-    symbol: str,
-    days: int = 30,
-    session: AsyncSession = Depends(get_session)
-):
-    """Get historical analysis for a specific symbol"""
-    # Map symbol to column name
-    symbol_mapping = {
-        'AAPL': 'apple_price',
-        'TSLA': 'tesla_price',
-        'MSFT': 'microsoft_price',
-        'GOOGL': 'google_price',
-        'NVDA': 'nvidia_price',
-        'BRK': 'berkshire_price',
-        'NFLX': 'netflix_price',
-        'AMZN': 'amazon_price',
-        'META': 'meta_price',
-        'SPY': 's_p_500_price',
-        'QQQ': 'nasdaq_100_price',
-        'BTC': 'bitcoin_price',
-        'ETH': 'ethereum_price',
-        'GOLD': 'gold_price',
-        'SILVER': 'silver_price',
-        'PLATINUM': 'platinum_price',
-        'COPPER': 'copper_price',
-        'OIL': 'crude_oil_price',
-        'NATURAL_GAS': 'natural_gas_price'
-    }
-    
-    if symbol.upper() not in symbol_mapping:
-        raise HTTPException(status_code=400, detail=f"Symbol {symbol} not supported")
-    
-    column_name = symbol_mapping[symbol.upper()]
-    
-    # Get historical data
-    result = await session.execute(
-        sa.select(StockData).order_by(StockData.date.desc()).limit(days)
-    )
-    records = result.scalars().all()
-    
-    if not records:
-        raise HTTPException(status_code=404, detail="No data available")
-    
-    # Extract prices and dates
-    prices = []
-    dates = []
-    for record in records:
-        price = getattr(record, column_name)
-        if price is not None:
-            prices.append(price)
-            dates.append(record.date.isoformat() if record.date else None)
-    
-    if not prices:
-        raise HTTPException(status_code=404, detail=f"No price data available for {symbol}")
-    
-    # Calculate analysis
+@app.get("/api/market-overview")
+async def get_market_overview(request: Request, conn: AsyncConnection = Depends(get_conn)):
+    """Get a market overview with latest prices and basic statistics"""
+    return await _conditional_response(request, "overview", conn, lambda: _market_overview(conn))
+
+def _price_summary(prices: List[float]) -> Dict[str, Any]:
+    """Change and volatility statistics for a newest-first price series"""
     current_price = prices[0]
     start_price = prices[-1]
     price_change = current_price - start_price
     price_change_pct = (price_change / start_price) * 100 if start_price != 0 else 0
     
-    # Calculate volatility (standard deviation)
+    # Calculate volatility (population standard deviation) over a contiguous float64 array
     if len(prices) > 1:
-        mean_price = sum(prices) / len(prices)
-        variance = sum((p - mean_price) ** 2 for p in prices) / len(prices)
-        volatility = variance ** 0.5
+        volatility = float(np.fromiter(prices, dtype=np.float64, count=len(prices)).std())
     else:
         volatility = 0
     
     return {
-        "symbol": symbol.upper(),
         "current_price": current_price,
         "start_price": start_price,
         "price_change": price_change,
         "price_change_pct": price_change_pct,
-        "volatility": volatility,
+        "volatility": volatility
+    }
+
+async def _historical_analysis(conn: AsyncConnection, symbol: str, days: int) -> Dict[str, Any]:
+    """Build the historical analysis response for a symbol"""
+    ticker = symbol.upper()
+    price_col = _SYMBOL_COL.get(ticker)
+    if price_col is None:
+        raise HTTPException(status_code=400, detail=f"Symbol {symbol} not supported")
+    
+    # Fetch (date, price) pairs only, letting SQLite skip missing prices
+    result = await conn.execute(
+        sa.select(StockData.date, price_col)
+        .where(price_col.isnot(None))
+        .order_by(StockData.date.desc())
+        .limit(days)
+    )
+    rows = result.all()
+    
+    if not rows:
+        raise HTTPException(status_code=404, detail=f"No price data available for {symbol}")
+    
+    prices = [price for _, price in rows]
+    dates = [date for date, _ in rows]
+    
+    return {
+        "symbol": ticker,
+        **_price_summary(prices),
         "analysis_period_days": days,
         "data_points": len(prices),
         "historical_data": list(zip(dates, prices))
     }
 
-@app.get("/tools")
-async def get_tools():
-    """Get LLM tool definitions for enrich MCP"""
-    tools = [
+# Packed (date, price) record layout served to clients that Accept application/octet-stream
+_PACKED_HISTORY_DTYPE = np.dtype([('date', '<M8[s]'), ('price', '<f8')])
+
+@app.get("/api/historical-analysis")
+async def get_historical_analysis(
+    symbol: str,
+    request: Request,
+    response: Response,
+    days: int = 30,
+    conn: AsyncConnection = Depends(get_conn)
+):
+    """Get historical analysis for a specific symbol"""
+    analysis = await _cached_response(
+        f"hist:{symbol.upper()}:{days}",
+        lambda: _historical_analysis(conn, symbol, days),
+        _history_cache
+    )
+    
+    # Analytics clients can skip JSON and read the series with np.frombuffer.
+    # Both representations share this URL, so caches must key on Accept.
+    if "application/octet-stream" in request.headers.get("accept", ""):
+        packed = np.array(analysis["historical_data"], dtype=_PACKED_HISTORY_DTYPE)
+        return Response(
+            content=packed.tobytes(),
+            media_type="application/octet-stream",
+            headers={"X-Record-Dtype": str(_PACKED_HISTORY_DTYPE.descr), "Vary": "Accept"}
+        )
+    response.headers["Vary"] = "Accept"
+    return analysis
+
+async def _snapshot(conn: AsyncConnection, tickers: Tuple[str, ...], days: int) -> Dict[str, Any]:
+    """Build latest price and window statistics for several symbols from one query"""
+    # Each symbol keeps its own newest-first window of non-missing prices,
+    # exactly as /api/historical-analysis selects it
+    windows = [
+        sa.select(sa.literal(ticker).label("symbol"), StockData.date, _SYMBOL_COL[ticker].label("price"))
+        .where(_SYMBOL_COL[ticker].isnot(None))
+        .order_by(StockData.date.desc())
+        .limit(days)
+        .subquery()
+        .select()
+        for ticker in tickers
+    ]
+    result = await conn.execute(
+        sa.union_all(*windows).order_by(sa.text("symbol"), sa.text("date DESC"))
+    )
+    
+    series = {ticker: [] for ticker in tickers}
+    for ticker, date, price in result:
+        series[ticker].append((date, price))
+    
+    snapshot = {}
+    for ticker, rows in series.items():
+        if rows:
+            prices = [price for _, price in rows]
+            snapshot[ticker] = {"as_of": rows[0][0], **_price_summary(prices), "data_points": len(prices)}
+        else:
+            snapshot[ticker] = None
+    
+    return {"analysis_period_days": days, "symbols": snapshot}
+
+@app.get("/api/snapshot")
+async def get_snapshot(
+    symbols: str,
+    days: int = 30,
+    conn: AsyncConnection = Depends(get_conn)
+):
+    """Get latest prices and historical statistics for several symbols in one request"""
+    tickers = tuple(dict.fromkeys(s.strip().upper() for s in symbols.split(",") if s.strip()))
+    unsupported = [ticker for ticker in tickers if ticker not in _SYMBOL_COL]
+    if not tickers or unsupported:
+        raise HTTPException(status_code=400, detail=f"Symbols not supported: {', '.join(unsupported) or symbols}")
+    
+    return await _cached_response(
+        f"snap:{','.join(tickers)}:{days}",
+        lambda: _snapshot(conn, tickers, days),
+        _history_cache
+    )
+
+# Static payloads are encoded once at import rather than per request
+_TOOLS_PAYLOAD = {
+    "tools": [
         {
             "type": "function",
             "function": {
@@ -371,7 +455,8 @@ async def get_tools():
                         "limit": {
                             "type": "integer",
                             "description": "Maximum number of records to return",
-                            "default": 100
+                            "default": 100,
+                            "maximum": 1000
                         },
                         "offset": {
                             "type": "integer",
@@ -441,64 +526,319 @@ async def get_tools():
                     "required": ["symbol"]
                 }
             }
+        },
+        {
+            "type": "function",
+            "function": {
+                "name": "get_market_snapshot",
+                "description": "Get the latest price, price change and volatility for several symbols at once. Prefer this over repeated get_historical_analysis calls",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "symbols": {
+                            "type": "string",
+                            "description": "Comma-separated stock symbols (e.g., AAPL,TSLA,BTC); same symbols as get_historical_analysis"
+                        },
+                        "days": {
+                            "type": "integer",
+                            "description": "Number of days to analyze",
+                            "default": 30
+                        }
+                    },
+                    "required": ["symbols"]
+                }
+            }
         }
     ]
-    
-    return {"tools": tools}
+}
+_TOOLS_BYTES = orjson.dumps(_TOOLS_PAYLOAD)
+
+_ROOT_PAYLOAD = {
+    "message": "Unified Stock Market Analysis Platform",
+    "version": "2.0.0",
+    "description": "Combines enrich MCP API with Consilium MCP visual consensus engine",
+    "endpoints": {
+        "api": "/api/* - REST API endpoints for stock data",
+        "tools": "/tools - LLM tool definitions",
+        "web_ui": "/gradio - Gradio web interface (if running)",
+        "docs": "/docs - API documentation"
+    },
+    "features": [
+        "Historical stock market data access",
+        "LLM function calling support",
+        "Market analysis and statistics",
+        "Visual consensus engine (if Consilium available)",
+        "Raw material price correlation analysis"
+    ]
+}
+_ROOT_BYTES = orjson.dumps(_ROOT_PAYLOAD)
+
+# The static payloads only change on redeploy, so let clients and proxies reuse them
+_STATIC_HEADERS = {"Cache-Control": "public, max-age=3600"}
+
+@app.get("/tools")
+async def get_tools():
+    """Get LLM tool definitions for enrich MCP"""
+    return Response(content=_TOOLS_BYTES, media_type="application/json", headers=_STATIC_HEADERS)
 
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
-    return {
-        "message": "Unified Stock Market Analysis Platform",
-        "version": "2.0.0",
-        "description": "Combines enrich MCP API with Consilium MCP visual consensus engine",
-        "endpoints": {
-            "api": "/api/* - REST API endpoints for stock data",
-            "tools": "/tools - LLM tool definitions",
-            "web_ui": "/gradio - Gradio web interface (if running)",
-            "docs": "/docs - API documentation"
-        },
-        "features": [
-            "Historical stock market data access",
-            "LLM function calling support",
-            "Market analysis and statistics",
-            "Visual consensus engine (if Consilium available)",
-            "Raw material price correlation analysis"
-        ]
-    }
+    return Response(content=_ROOT_BYTES, media_type="application/json", headers=_STATIC_HEADERS)
+
+# Keep-alive client reused by the Gradio callbacks that call the REST API,
+# created on first use so API-only processes never open it
+_api_client: Optional[httpx.AsyncClient] = None
+
+def _get_api_client() -> httpx.AsyncClient:
+    """Return the pooled REST API client for the web UI, creating it on first use"""
+    global _api_client
+    if _api_client is None:
+        _api_client = httpx.AsyncClient(
+            base_url="http://localhost:8001",
+            timeout=5.0,
+            limits=httpx.Limits(max_keepalive_connections=20)
+        )
+    return _api_client
 
 # ==============================================================================
-# CONSILIUM MCP INTEGRATION (if available)
+# CONSILIUM MCP INTEGRATION
 # ==============================================================================
 
-if CONSILIUM_AVAILABLE:
-    # API Configuration
-    MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY") 
-    SAMBANOVA_API_KEY = os.getenv("SAMBANOVA_API_KEY")
-    MODERATOR_MODEL = os.getenv("MODERATOR_MODEL", "mistral")
-
-    # Session-based storage for isolated discussions
-    user_sessions: Dict[str, Dict] = {}
-
-    # Model Images
-    avatar_images = {
-        "QwQ-32B": "https://cdn-avatars.huggingface.co/v1/production/uploads/620760a26e3b7210c2ff1943/-s1gyJfvbE1RgO5iBeNOi.png",
-        "DeepSeek-R1": "https://logosandtypes.com/wp-content/uploads/2025/02/deepseek.svg",
-        "Mistral Large": "https://logosandtypes.com/wp-content/uploads/2025/02/mistral-ai.svg",
-        "Meta-Llama-3.3-70B-Instruct": "https://registry.npmmirror.com/@lobehub/icons-static-png/1.46.0/files/dark/meta-color.png",
-    }
+# Shared client for the model APIs, created on the first model call so that
+# API-only processes never open it. One client means one TLS context and one
+# keep-alive pool per provider host; with h2 installed, concurrent calls to a
+# host are multiplexed over a single HTTP/2 connection.
+_llm_client: Optional[httpx.AsyncClient] = None
+
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+def _get_llm_client() -> httpx.AsyncClient:
+    """Return the pooled model API client, creating it on first use"""
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = httpx.AsyncClient(
+            timeout=30,
+            transport=httpx.AsyncHTTPTransport(
+                http2=_HTTP2_AVAILABLE,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+            )
+        )
+    return _llm_client
+
+# Model API failures worth retrying. After five consecutive failed calls a
+# provider is skipped for a minute instead of waiting out more timeouts.
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+_BREAKER_FAIL_MAX = 5
+_BREAKER_RESET_SECONDS = 60
+_breaker_failures: Dict[str, int] = {}
+_breaker_open_until: Dict[str, float] = {}
+
+# Requests per second allowed to each model provider
+_RATE_LIMITS = MappingProxyType({'mistral': 5, 'sambanova': 5})
+_next_request_at: Dict[str, float] = {}
+
+async def _throttle(provider: str):
+    """Wait for the provider's next free request slot"""
+    now = time.monotonic()
+    slot = max(now, _next_request_at.get(provider, 0.0))
+    _next_request_at[provider] = slot + 1.0 / _RATE_LIMITS[provider]
+    if slot > now:
+        await asyncio.sleep(slot - now)
+
+async def _post_completion(provider: str, url: str, headers: Dict[str, str], data: Dict[str, Any],
+                           attempts: int = 3) -> Optional[httpx.Response]:
+    """POST to a model API with jittered exponential backoff behind a per-provider circuit breaker"""
+    if time.monotonic() < _breaker_open_until.get(provider, 0.0):
+        print(f"{provider} API circuit open - skipping call")
+        return None
+    
+    # Encoded once for all attempts; headers already carry the JSON content type
+    body = orjson.dumps(data)
+    response = None
+    for attempt in range(attempts):
+        try:
+            await _throttle(provider)
+            response = await _get_llm_client().post(url, headers=headers, content=body)
+            if response.status_code not in _RETRY_STATUSES:
+                break
+        except httpx.TransportError as e:
+            print(f"{provider} API transport error (attempt {attempt + 1}/{attempts}): {e}")
+            response = None
+        if attempt < attempts - 1:
+            await asyncio.sleep(random.uniform(0, min(20, 2 ** attempt)))
+    
+    if response is not None and response.status_code not in _RETRY_STATUSES:
+        _breaker_failures[provider] = 0
+    else:
+        failures = _breaker_failures.get(provider, 0) + 1
+        if failures >= _BREAKER_FAIL_MAX:
+            _breaker_open_until[provider] = time.monotonic() + _BREAKER_RESET_SECONDS
+            failures = 0
+        _breaker_failures[provider] = failures
+    return response
+
+# Sampling temperature for both providers
+MODEL_TEMPERATURE = float(os.getenv("MODEL_TEMPERATURE", "0.7"))
+
+# Completions for repeated (model, prompt, temperature) calls within a day. At
+# temperature 1.0 and above outputs are meant to diverge, so nothing is cached.
+_completion_cache = TTLCache(maxsize=1024, ttl=86400)
+_CACHE_MAX_TEMPERATURE = 1.0
+
+# Per-session discussion checkpoints, one JSON line per completed model reply
+_SESSIONS_DIR = "sessions"
+
+class _Checkpoint:
+    """Replies of one discussion keyed by (round, model, prompt hash), persisted as JSONL"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lines: List[bytes] = []
+        self.replies: Dict[Tuple[int, str, str], str] = {}
+        try:
+            with open(path, "rb") as f:
+                self.lines = [line for line in f if line.strip()]
+        except FileNotFoundError:
+            return
+        for line in self.lines:
+            entry = orjson.loads(line)
+            self.replies[(entry["round"], entry["model"], entry["prompt_hash"])] = entry["reply"]
+
+    def get(self, number: int, model: str, prompt_hash: str) -> Optional[str]:
+        return self.replies.get((number, model, prompt_hash))
+
+    def record(self, number: int, model: str, prompt_hash: str, reply: str):
+        """Append one reply and rewrite the file atomically, so a crash never leaves a partial line"""
+        self.replies[(number, model, prompt_hash)] = reply
+        self.lines.append(orjson.dumps(
+            {"round": number, "model": model, "prompt_hash": prompt_hash, "reply": reply},
+            option=orjson.OPT_APPEND_NEWLINE
+        ))
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.writelines(self.lines)
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
 
-    def get_session_id(request: gr.Request = None) -> str:
-        """Generate or retrieve session ID"""
-        if request and hasattr(request, 'session_hash'):
-            return request.session_hash
-        return str(uuid.uuid4())
+# Formatted enrich MCP research results, matching the API's 30 second cache
+_research_cache = TTLCache(maxsize=512, ttl=30)
 
-    def get_or_create_session_state(session_id: str) -> Dict:
-        """Get or create isolated session state"""
-        if session_id not in user_sessions:
-            user_sessions[session_id] = {
+# Keep-alive session for the synchronous research calls back into this API;
+# transient gateway errors are retried with backoff
+_INTERNAL_SESSION = requests.Session()
+_INTERNAL_SESSION.mount("http://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+))
+
+_API_BASE_URL = "http://localhost:8001"
+
+def _research_historical_analysis(arguments: dict) -> Optional[str]:
+    """Summarise /api/historical-analysis for one symbol"""
+    symbol = arguments.get('symbol', 'AAPL')
+    days = arguments.get('days', 30)
+    response = _INTERNAL_SESSION.get(f"{_API_BASE_URL}/api/historical-analysis", params={"symbol": symbol, "days": days})
+    if response.status_code == 200:
+        data = orjson.loads(response.content)
+        return f"Historical analysis for {symbol}:\n\nCurrent Price: ${data['current_price']:.2f}\nPrice Change: ${data['price_change']:.2f} ({data['price_change_pct']:.2f}%)\nVolatility: {data['volatility']:.2f}\nAnalysis Period: {data['analysis_period_days']} days\nData Points: {data['data_points']}"
+    return None
+
+def _research_market_snapshot(arguments: dict) -> Optional[str]:
+    """Summarise /api/snapshot for several symbols"""
+    symbols = arguments.get('symbols', 'AAPL')
+    days = arguments.get('days', 30)
+    response = _INTERNAL_SESSION.get(f"{_API_BASE_URL}/api/snapshot", params={"symbols": symbols, "days": days})
+    if response.status_code == 200:
+        data = orjson.loads(response.content)
+        parts = [f"Market snapshot ({data['analysis_period_days']} days):\n\n"]
+        for symbol, stats in data['symbols'].items():
+            if stats:
+                parts.append(f"- {symbol}: ${stats['current_price']:.2f} ({stats['price_change_pct']:+.2f}%), volatility {stats['volatility']:.2f}\n")
+            else:
+                parts.append(f"- {symbol}: no data\n")
+        return "".join(parts)
+    return None
+
+def _research_market_overview(arguments: dict) -> Optional[str]:
+    """List the latest prices from /api/market-overview"""
+    response = _INTERNAL_SESSION.get(f"{_API_BASE_URL}/api/market-overview")
+    if response.status_code == 200:
+        data = orjson.loads(response.content)
+        parts = ["Market Overview:\n\nLatest Prices:\n"]
+        parts.extend(
+            f"- {key}: ${value}\n"
+            for key, value in data['latest_prices'].items()
+            if 'price' in key.lower() and value is not None
+        )
+        return "".join(parts)
+    return None
+
+def _research_latest_prices(arguments: dict) -> Optional[str]:
+    """List the prices from /api/latest-prices"""
+    response = _INTERNAL_SESSION.get(f"{_API_BASE_URL}/api/latest-prices")
+    if response.status_code == 200:
+        data = orjson.loads(response.content)
+        parts = ["Latest Market Prices:\n\n"]
+        parts.extend(
+            f"- {key}: ${value}\n"
+            for key, value in data.items()
+            if 'price' in key.lower() and value is not None
+        )
+        return "".join(parts)
+    return None
+
+# Research functions answered by the enrich MCP endpoints; anything else goes
+# to the research agent
+_MCP_DISPATCH = MappingProxyType({
+    "get_historical_analysis": _research_historical_analysis,
+    "get_market_snapshot": _research_market_snapshot,
+    "get_market_overview": _research_market_overview,
+    "get_latest_prices": _research_latest_prices
+})
+_MCP_FUNCTIONS = frozenset(_MCP_DISPATCH)
+
+# API Configuration
+MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY") 
+SAMBANOVA_API_KEY = os.getenv("SAMBANOVA_API_KEY")
+MODERATOR_MODEL = os.getenv("MODERATOR_MODEL", "mistral")
+
+# Session-based storage for isolated discussions, capped in size; a session
+# idle for an hour is dropped
+user_sessions: TTLCache = TTLCache(maxsize=1000, ttl=3600)
+_sessions_lock = threading.Lock()
+
+# Model Images
+avatar_images = MappingProxyType({
+    "QwQ-32B": "https://cdn-avatars.huggingface.co/v1/production/uploads/620760a26e3b7210c2ff1943/-s1gyJfvbE1RgO5iBeNOi.png",
+    "DeepSeek-R1": "https://logosandtypes.com/wp-content/uploads/2025/02/deepseek.svg",
+    "Mistral Large": "https://logosandtypes.com/wp-content/uploads/2025/02/mistral-ai.svg",
+    "Meta-Llama-3.3-70B-Instruct": "https://registry.npmmirror.com/@lobehub/icons-static-png/1.46.0/files/dark/meta-color.png",
+})
+
+def get_session_id(request: "gr.Request" = None) -> str:
+    """Generate or retrieve session ID"""
+    if request and hasattr(request, 'session_hash'):
+        return request.session_hash
+    return str(uuid.uuid4())
+
+def get_or_create_session_state(session_id: str) -> Dict:
+    """Get or create isolated session state"""
+    with _sessions_lock:
+        state = user_sessions.get(session_id)
+        if state is None:
+            state = {
                 "roundtable_state": {
                     "participants": [],
                     "messages": [],
@@ -513,244 +853,323 @@ if CONSILIUM_AVAILABLE:
                     "sambanova": None
                 }
             }
-        return user_sessions[session_id]
-
-    class VisualConsensusEngine:
-        def __init__(self, moderator_model: str = None, update_callback=None, session_id: str = None):
-            self.moderator_model = moderator_model or MODERATOR_MODEL
-            self.search_agent = EnhancedResearchAgent()
-            self.update_callback = update_callback
-            self.session_id = session_id
-            
-            # Get session-specific keys or fall back to global
-            session = get_or_create_session_state(session_id) if session_id else {"api_keys": {}}
-            session_keys = session.get("api_keys", {})
+        # Re-inserting restarts the idle timer on every access
+        user_sessions[session_id] = state
+    return state
+
+# Participating models as (model id, display name, API key provider)
+_MODEL_SCHEMA = (
+    ('mistral', 'Mistral Large', 'mistral'),
+    ('sambanova_deepseek', 'DeepSeek-R1', 'sambanova'),
+    ('sambanova_llama', 'Meta-Llama-3.3-70B-Instruct', 'sambanova'),
+    ('sambanova_qwq', 'QwQ-32B', 'sambanova')
+)
+
+# SambaNova model IDs for each participant
+_SAMBANOVA_MODEL_MAPPING = MappingProxyType({
+    'sambanova_deepseek': 'deepseek-r1',
+    'sambanova_llama': 'meta-llama-3.3-70b-instruct',
+    'sambanova_qwq': 'qwq-32b'
+})
+
+# PROFESSIONAL: Strong, expert role definitions matched to decision protocols
+_ROLES = MappingProxyType({
+    'standard': "Provide expert analysis with clear reasoning and evidence.",
+    'expert_advocate': "You are a PASSIONATE EXPERT advocating for your specialized position. Present compelling evidence with conviction.",
+    'critical_analyst': "You are a RIGOROUS CRITIC. Identify flaws, risks, and weaknesses in arguments with analytical precision.",
+    'strategic_advisor': "You are a STRATEGIC ADVISOR. Focus on practical implementation, real-world constraints, and actionable insights.",
+    'research_specialist': "You are a RESEARCH EXPERT with deep domain knowledge. Provide authoritative analysis and evidence-based insights.",
+    'innovation_catalyst': "You are an INNOVATION EXPERT. Challenge conventional thinking and propose breakthrough approaches."
+})
+
+# PROFESSIONAL: Different prompt styles based on decision protocol
+_PROTOCOL_STYLES = MappingProxyType({
+    'consensus': {
+        'intensity': 'collaborative',
+        'goal': 'finding common ground',
+        'language': 'respectful but rigorous'
+    },
+    'majority_voting': {
+        'intensity': 'competitive',
+        'goal': 'winning the argument',
+        'language': 'passionate advocacy'
+    },
+    'weighted_voting': {
+        'intensity': 'analytical',
+        'goal': 'demonstrating expertise',
+        'language': 'authoritative analysis'
+    },
+    'ranked_choice': {
+        'intensity': 'comprehensive',
+        'goal': 'exploring all options',
+        'language': 'systematic evaluation'
+    },
+    'unanimity': {
+        'intensity': 'diplomatic',
+        'goal': 'unanimous agreement',
+        'language': 'bridge-building dialogue'
+    }
+})
+
+class VisualConsensusEngine:
+    def __init__(self, moderator_model: str = None, update_callback=None, session_id: str = None):
+        if not _load_consilium():
+            raise RuntimeError("Consilium components are not available - install the Consilium MCP research tools to use the consensus engine")
+        self.moderator_model = moderator_model or MODERATOR_MODEL
+        self.search_agent = EnhancedResearchAgent()
+        self.update_callback = update_callback
+        self.session_id = session_id
+        
+        # Get session-specific keys or fall back to global
+        session = get_or_create_session_state(session_id) if session_id else {"api_keys": {}}
+        session_keys = session.get("api_keys", {})
+        
+        mistral_key = session_keys.get("mistral") or MISTRAL_API_KEY
+        sambanova_key = session_keys.get("sambanova") or SAMBANOVA_API_KEY
+        
+        # Store session keys for API calls
+        self.session_keys = {
+            'mistral': mistral_key,
+            'sambanova': sambanova_key
+        }
+        
+        # Research Agent stays visible but is no longer an active participant
+        self.models = {
+            model: {
+                'name': name,
+                'api_key': self.session_keys[provider],
+                'available': bool(self.session_keys[provider])
+            }
+            for model, name, provider in _MODEL_SCHEMA
+        }
+        
+        # Request headers per provider, built once per engine
+        self.api_headers = {
+            provider: {"Authorization": f"Bearer {key}", "Content-Type": "application/json"}
+            for provider, key in self.session_keys.items()
+        }
+        
+        self.roles = _ROLES
+        self.protocol_styles = _PROTOCOL_STYLES
+
+    def _execute_research_function(self, function_name: str, arguments: dict, requesting_model_name: str = None) -> str:
+        """Execute research functions including enrich MCP data access"""
+        try:
+            # Market data functions are answered from our own enrich MCP endpoints
+            if function_name in _MCP_FUNCTIONS:
+                # Identical lookups from different experts share one formatted result
+                cache_key = (function_name, orjson.dumps(arguments, option=orjson.OPT_SORT_KEYS))
+                result = _research_cache.get(cache_key)
+                if result is None:
+                    result = _MCP_DISPATCH[function_name](arguments)
+                    if result is not None:
+                        _research_cache[cache_key] = result
+                if result is not None:
+                    return result
             
-            mistral_key = session_keys.get("mistral") or MISTRAL_API_KEY
-            sambanova_key = session_keys.get("sambanova") or SAMBANOVA_API_KEY
+            # Fall back to the original research agent for other queries
+            return self.search_agent.execute_function(function_name, arguments)
             
-            # Research Agent stays visible but is no longer an active participant
-            self.models = {
-                'mistral': {
-                    'name': 'Mistral Large',
-                    'api_key': mistral_key,
-                    'available': bool(mistral_key)
-                },
-                'sambanova_deepseek': {
-                    'name': 'DeepSeek-R1',
-                    'api_key': sambanova_key,
-                    'available': bool(sambanova_key)
-                },
-                'sambanova_llama': {
-                    'name': 'Meta-Llama-3.3-70B-Instruct',
-                    'api_key': sambanova_key,
-                    'available': bool(sambanova_key)
-                },
-                'sambanova_qwq': {
-                    'name': 'QwQ-32B',
-                    'api_key': sambanova_key,
-                    'available': bool(sambanova_key)
-                }
+        except Exception as e:
+            return f"Error executing research function {function_name}: {str(e)}"
+
+    async def call_model(self, model: str, prompt: str, context: str = "") -> Optional[str]:
+        """Call the specified model with the given prompt"""
+        if model not in self.models:
+            return None
+        
+        model_info = self.models[model]
+        if not model_info['available']:
+            return None
+        
+        # API keys only authorise the call, so they stay out of the cache key
+        use_cache = MODEL_TEMPERATURE < _CACHE_MAX_TEMPERATURE
+        cache_key = hashlib.blake2b(f"{model}|{prompt}|{MODEL_TEMPERATURE}".encode(), digest_size=16).digest()
+        if use_cache:
+            cached = _completion_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        try:
+            if model == 'mistral':
+                content = await self._call_mistral(prompt)
+            elif model.startswith('sambanova_'):
+                content = await self._call_sambanova(model, prompt)
+            else:
+                return None
+            if content is not None and use_cache:
+                _completion_cache[cache_key] = content
+            return content
+        except Exception as e:
+            print(f"Error calling model {model}: {e}")
+            return None
+
+    def _round_prompt(self, question: str, protocol: str, role: str, previous: Dict[str, str]) -> str:
+        """Prompt for one discussion round, quoting the previous round's replies"""
+        style = self.protocol_styles.get(protocol, self.protocol_styles['consensus'])
+        prompt = (
+            f"{self.roles.get(role, self.roles['standard'])}\n\n"
+            f"Decision protocol: {protocol.replace('_', ' ')} - a {style['intensity']} discussion "
+            f"aimed at {style['goal']}, in {style['language']}.\n\n"
+            f"Question: {question}"
+        )
+        if previous:
+            views = "\n".join(f"- {name}: {reply}" for name, reply in previous.items())
+            prompt += f"\n\nExpert views from the previous round:\n{views}\n\nRefine your position in light of these views."
+        return prompt
+
+    async def run_discussion(self, question: str, rounds: int, protocol: str, role: str) -> List[Dict[str, str]]:
+        """Run the discussion rounds, calling every available model concurrently in each round.
+
+        Each reply is checkpointed to sessions/{session_id}.jsonl as it
+        arrives, so an interrupted run resumes from the replies already on
+        disk. The file is removed once every round has completed.
+        """
+        session_id = self.session_id or hashlib.blake2b(
+            f"{question}|{rounds}|{protocol}|{role}".encode(), digest_size=16
+        ).hexdigest()
+        checkpoint = _Checkpoint(os.path.join(_SESSIONS_DIR, f"{session_id}.jsonl"))
+        participants = [model for model, info in self.models.items() if info['available']]
+        transcript = []
+        previous: Dict[str, str] = {}
+        for number in range(rounds):
+            prompt = self._round_prompt(question, protocol, role, previous)
+            prompt_hash = hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()
+
+            async def reply(model: str) -> Optional[str]:
+                content = checkpoint.get(number, model, prompt_hash)
+                if content is None:
+                    content = await self.call_model(model, prompt)
+                    if content:
+                        checkpoint.record(number, model, prompt_hash, content)
+                return content
+
+            replies = await asyncio.gather(*map(reply, participants), return_exceptions=True)
+            previous = {
+                self.models[model]['name']: content
+                for model, content in zip(participants, replies)
+                if content and not isinstance(content, BaseException)
             }
-            
-            # Store session keys for API calls
-            self.session_keys = {
-                'mistral': mistral_key,
-                'sambanova': sambanova_key
+            transcript.append(previous)
+        checkpoint.remove()
+        return transcript
+
+    async def _call_mistral(self, prompt: str) -> Optional[str]:
+        """Call Mistral API"""
+        if not self.session_keys['mistral']:
+            return None
+        
+        try:
+            data = {
+                "model": "mistral-large-latest",
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": 1000,
+                "temperature": MODEL_TEMPERATURE
             }
             
-            # PROFESSIONAL: Strong, expert role definitions matched to decision protocols
-            self.roles = {
-                'standard': "Provide expert analysis with clear reasoning and evidence.",
-                'expert_advocate': "You are a PASSIONATE EXPERT advocating for your specialized position. Present compelling evidence with conviction.",
-                'critical_analyst': "You are a RIGOROUS CRITIC. Identify flaws, risks, and weaknesses in arguments with analytical precision.",
-                'strategic_advisor': "You are a STRATEGIC ADVISOR. Focus on practical implementation, real-world constraints, and actionable insights.",
-                'research_specialist': "You are a RESEARCH EXPERT with deep domain knowledge. Provide authoritative analysis and evidence-based insights.",
-                'innovation_catalyst': "You are an INNOVATION EXPERT. Challenge conventional thinking and propose breakthrough approaches."
-            }
+            response = await _post_completion(
+                'mistral',
+                "https://api.mistral.ai/v1/chat/completions",
+                self.api_headers['mistral'],
+                data
+            )
             
-            # PROFESSIONAL: Different prompt styles based on decision protocol
-            self.protocol_styles = {
-                'consensus': {
-                    'intensity': 'collaborative',
-                    'goal': 'finding common ground',
-                    'language': 'respectful but rigorous'
-                },
-                'majority_voting': {
-                    'intensity': 'competitive',
-                    'goal': 'winning the argument',
-                    'language': 'passionate advocacy'
-                },
-                'weighted_voting': {
-                    'intensity': 'analytical',
-                    'goal': 'demonstrating expertise',
-                    'language': 'authoritative analysis'
-                },
-                'ranked_choice': {
-                    'intensity': 'comprehensive',
-                    'goal': 'exploring all options',
-                    'language': 'systematic evaluation'
-                },
-                'unanimity': {
-                    'intensity': 'diplomatic',
-                    'goal': 'unanimous agreement',
-                    'language': 'bridge-building dialogue'
-                }
-            }
-
-        def _execute_research_function(self, function_name: str, arguments: dict, requesting_model_name: str = None) -> str:
-            """Execute research functions including enrich MCP data access"""
-            try:
-                # First, try to use enrich MCP data if the query is related to historical data
-                if any(keyword in function_name.lower() for keyword in ['historical', 'stock', 'price', 'market', 'data']):
-                    # Call our own enrich MCP endpoints
-                    base_url = "http://localhost:8001"
-                    
-                    if function_name == "get_historical_analysis":
-                        symbol = arguments.get('symbol', 'AAPL')
-                        days = arguments.get('days', 30)
-                        response = requests.get(f"{base_url}/api/historical-analysis?symbol={symbol}&days={days}")
-                        if response.status_code == 200:
-                            data = response.json()
-                            return f"Historical analysis for {symbol}:\n\nCurrent Price: ${data['current_price']:.2f}\nPrice Change: ${data['price_change']:.2f} ({data['price_change_pct']:.2f}%)\nVolatility: {data['volatility']:.2f}\nAnalysis Period: {data['analysis_period_days']} days\nData Points: {data['data_points']}"
-                    
-                    elif function_name == "get_market_overview":
-                        response = requests.get(f"{base_url}/api/market-overview")
-                        if response.status_code == 200:
-                            data = response.json()
-                            overview = "Market Overview:\n\nLatest Prices:\n"
-                            for key, value in data['latest_prices'].items():
-                                if 'price' in key.lower() and value is not None:
-                                    overview += f"- {key}: ${value}\n"
-                            return overview
-                    
-                    elif function_name == "get_latest_prices":
-                        response = requests.get(f"{base_url}/api/latest-prices")
-                        if response.status_code == 200:
-                            data = response.json()
-                            prices = "Latest Market Prices:\n\n"
-                            for key, value in data.items():
-                                if 'price' in key.lower() and value is not None:
-                                    prices += f"- {key}: ${value}\n"
-                            return prices
-                
-                # Fall back to the original research agent for other queries
-                return self.search_agent.execute_function(function_name, arguments)
+            if response is None:
+                return None
+            elif response.status_code == 200:
+                result = orjson.loads(response.content)
+                return result['choices'][0]['message']['content']
+            else:
+                print(f"Mistral API error: {response.status_code} - {response.text}")
+                return None
                 
-            except Exception as e:
-                return f"Error executing research function {function_name}: {str(e)}"
+        except Exception as e:
+            print(f"Error calling Mistral: {e}")
+            return None
 
-        def call_model(self, model: str, prompt: str, context: str = "") -> Optional[str]:
-            """Call the specified model with the given prompt"""
-            if model not in self.models:
-                return None
+    async def _call_sambanova(self, model: str, prompt: str) -> Optional[str]:
+        """Call SambaNova API"""
+        if not self.session_keys['sambanova']:
+            return None
+        
+        try:
+            sambanova_model = _SAMBANOVA_MODEL_MAPPING.get(model, 'deepseek-r1')
             
-            model_info = self.models[model]
-            if not model_info['available']:
-                return None
+            data = {
+                "model": sambanova_model,
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": 1000,
+                "temperature": MODEL_TEMPERATURE
+            }
             
-            try:
-                if model == 'mistral':
-                    return self._call_mistral(prompt)
-                elif model.startswith('sambanova_'):
-                    return self._call_sambanova(model, prompt)
-                else:
-                    return None
-            except Exception as e:
-                print(f"Error calling model {model}: {e}")
-                return None
-
-        def _call_mistral(self, prompt: str) -> Optional[str]:
-            """Call Mistral API"""
-            if not self.session_keys['mistral']:
-                return None
+            response = await _post_completion(
+                'sambanova',
+                "https://api.sambanova.ai/v1/chat/completions",
+                self.api_headers['sambanova'],
+                data
+            )
             
-            try:
-                headers = {
-                    "Authorization": f"Bearer {self.session_keys['mistral']}",
-                    "Content-Type": "application/json"
-                }
-                
-                data = {
-                    "model": "mistral-large-latest",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "max_tokens": 1000,
-                    "temperature": 0.7
-                }
-                
-                response = requests.post(
-                    "https://api.mistral.ai/v1/chat/completions",
-                    headers=headers,
-                    json=data,
-                    timeout=30
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    return result['choices'][0]['message']['content']
-                else:
-                    print(f"Mistral API error: {response.status_code} - {response.text}")
-                    return None
-                    
-            except Exception as e:
-                print(f"Error calling Mistral: {e}")
+            if response is None:
                 return None
-
-        def _call_sambanova(self, model: str, prompt: str) -> Optional[str]:
-            """Call SambaNova API"""
-            if not self.session_keys['sambanova']:
+            elif response.status_code == 200:
+                result = orjson.loads(response.content)
+                return result['choices'][0]['message']['content']
+            else:
+                print(f"SambaNova API error: {response.status_code} - {response.text}")
                 return None
-            
-            try:
-                headers = {
-                    "Authorization": f"Bearer {self.session_keys['sambanova']}",
-                    "Content-Type": "application/json"
-                }
                 
-                # Map model names to SambaNova model IDs
-                model_mapping = {
-                    'sambanova_deepseek': 'deepseek-r1',
-                    'sambanova_llama': 'meta-llama-3.3-70b-instruct',
-                    'sambanova_qwq': 'qwq-32b'
-                }
-                
-                sambanova_model = model_mapping.get(model, 'deepseek-r1')
-                
-                data = {
-                    "model": sambanova_model,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "max_tokens": 1000,
-                    "temperature": 0.7
-                }
-                
-                response = requests.post(
-                    "https://api.sambanova.ai/v1/chat/completions",
-                    headers=headers,
-                    json=data,
-                    timeout=30
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    return result['choices'][0]['message']['content']
-                else:
-                    print(f"SambaNova API error: {response.status_code} - {response.text}")
-                    return None
-                    
-            except Exception as e:
-                print(f"Error calling SambaNova: {e}")
-                return None
+        except Exception as e:
+            print(f"Error calling SambaNova: {e}")
+            return None
 
-    # ==============================================================================
-    # GRADIO WEB INTERFACE
-    # ==============================================================================
+# ==============================================================================
+# GRADIO WEB INTERFACE
+# ==============================================================================
 
-    def create_gradio_interface():
-        """Create the Gradio web interface"""
+# Quick Analysis tab output; indicators are filled in by analyze_stock
+_ANALYSIS_TEMPLATE = """
+📊 Analysis for {symbol} ({days} days)
+
+💰 Price Information:
+• Current Price: ${current_price:.2f}
+• Start Price: ${start_price:.2f}
+• Price Change: ${price_change:.2f} ({price_change_pct:.2f}%)
+
+📈 Volatility: {volatility:.2f}
+📊 Data Points: {data_points}
+
+💡 Interpretation:
+• {trend} trend
+• {volatility_level} volatility
+• {movement} price movement
+                                """
+
+# Dropdown choices, shared by every interface build
+_STOCK_SYMBOLS = tuple(_SYMBOL_COL)
+_PROTOCOL_CHOICES = tuple(_PROTOCOL_STYLES)
+_ROLE_CHOICES = ("balanced",) + tuple(role for role in _ROLES if role != 'standard')
+
+async def test_api():
+    """Check that the REST API answers on its root endpoint"""
+    try:
+        response = await _get_api_client().get("/")
+        if response.status_code == 200:
+            return "✅ API is running and responding correctly"
+        else:
+            return "❌ API is running but not responding correctly"
+    except:
+        return "❌ API is not accessible"
+
+def create_gradio_interface(enable_consensus: Optional[bool] = None):
+    """Create the Gradio web interface, adding the AI consensus tab when Consilium is available"""
+    import gradio as gr
+    
+    if enable_consensus is None:
+        enable_consensus = _load_consilium()
+    
+    with gr.Blocks(title="Unified Stock Market Analysis Platform", theme=gr.themes.Soft()) as interface:
         
-        with gr.Blocks(title="Unified Stock Market Analysis Platform", theme=gr.themes.Soft()) as interface:
-            
-            gr.Markdown("""
+        gr.Markdown("""
             # 📊 Unified Stock Market Analysis Platform
             
             This platform combines **enrich MCP** historical data access with **Consilium MCP** visual consensus engine 
@@ -762,12 +1181,12 @@ if CONSILIUM_AVAILABLE:
             - 🔍 **Research Tools**: Web search, Wikipedia, SEC filings, and more
             - 📊 **Raw Material Analysis**: Correlation analysis between commodities and tech stocks
             """)
+        
+        with gr.Tabs():
             
-            with gr.Tabs():
-                
-                # Tab 1: API Information
-                with gr.TabItem("🔌 API Information"):
-                    gr.Markdown("""
+            # Tab 1: API Information
+            with gr.TabItem("🔌 API Information"):
+                gr.Markdown("""
                     ## REST API Endpoints
                     
                     The platform provides a comprehensive REST API for programmatic access:
@@ -782,152 +1201,153 @@ if CONSILIUM_AVAILABLE:
                     
                     The API provides OpenAI-compatible function schemas for easy LLM integration.
                     """)
-                    
-                    with gr.Row():
-                        api_status = gr.Textbox(label="API Status", value="✅ API is running on http://localhost:8001", interactive=False)
-                        test_api_btn = gr.Button("Test API Connection")
-                    
-                    def test_api():
-                        try:
-                            response = requests.get("http://localhost:8001/")
-                            if response.status_code == 200:
-                                return "✅ API is running and responding correctly"
-                            else:
-                                return "❌ API is running but not responding correctly"
-                        except:
-                            return "❌ API is not accessible"
-                    
-                    test_api_btn.click(test_api, outputs=api_status)
                 
-                # Tab 2: Quick Analysis
-                with gr.TabItem("📊 Quick Analysis"):
-                    gr.Markdown("""
+                with gr.Row():
+                    api_status = gr.Textbox(label="API Status", value="✅ API is running on http://localhost:8001", interactive=False)
+                    test_api_btn = gr.Button("Test API Connection")
+                
+                test_api_btn.click(test_api, outputs=api_status)
+            
+            # Tab 2: Quick Analysis
+            with gr.TabItem("📊 Quick Analysis"):
+                gr.Markdown("""
                     ## Quick Stock Analysis
                     
                     Get instant analysis for any supported stock symbol.
                     """)
-                    
-                    with gr.Row():
-                        symbol_input = gr.Dropdown(
-                            choices=["AAPL", "TSLA", "MSFT", "GOOGL", "NVDA", "BRK", "NFLX", "AMZN", "META", "SPY", "QQQ", "BTC", "ETH", "GOLD", "SILVER", "PLATINUM", "COPPER", "OIL", "NATURAL_GAS"],
-                            label="Stock Symbol",
-                            value="AAPL"
+                
+                with gr.Row():
+                    symbol_input = gr.Dropdown(
+                        choices=_STOCK_SYMBOLS,
+                        label="Stock Symbol",
+                        value="AAPL"
+                    )
+                    days_input = gr.Slider(minimum=7, maximum=365, value=30, step=1, label="Analysis Period (days)")
+                
+                analyze_btn = gr.Button("Analyze Stock")
+                analysis_output = gr.Textbox(label="Analysis Results", lines=10)
+                
+                async def analyze_stock(symbol, days):
+                    try:
+                        response = await _get_api_client().get(
+                            "/api/historical-analysis",
+                            params={"symbol": symbol, "days": int(days)}
                         )
-                        days_input = gr.Slider(minimum=7, maximum=365, value=30, step=1, label="Analysis Period (days)")
-                    
-                    analyze_btn = gr.Button("Analyze Stock")
-                    analysis_output = gr.Textbox(label="Analysis Results", lines=10)
-                    
-                    def analyze_stock(symbol, days):
-                        try:
-                            response = requests.get(f"http://localhost:8001/api/historical-analysis?symbol={symbol}&days={days}")
-                            if response.status_code == 200:
-                                data = response.json()
-                                result = f"""
-📊 Analysis for {symbol} ({days} days)
-
-💰 Price Information:
-• Current Price: ${data['current_price']:.2f}
-• Start Price: ${data['start_price']:.2f}
-• Price Change: ${data['price_change']:.2f} ({data['price_change_pct']:.2f}%)
-
-📈 Volatility: {data['volatility']:.2f}
-📊 Data Points: {data['data_points']}
-
-💡 Interpretation:
-• {'📈 Bullish' if data['price_change_pct'] > 0 else '📉 Bearish'} trend
-• {'High' if data['volatility'] > data['current_price'] * 0.1 else 'Low'} volatility
-• {'Strong' if abs(data['price_change_pct']) > 10 else 'Moderate'} price movement
-                                """
-                                return result
-                            else:
-                                return f"Error: {response.status_code} - {response.text}"
-                        except Exception as e:
-                            return f"Error analyzing stock: {str(e)}"
-                    
-                    analyze_btn.click(analyze_stock, inputs=[symbol_input, days_input], outputs=analysis_output)
+                        if response.status_code == 200:
+                            data = orjson.loads(response.content)
+                            result = _ANALYSIS_TEMPLATE.format_map({
+                                **data,
+                                'symbol': symbol,
+                                'days': days,
+                                'trend': '📈 Bullish' if data['price_change_pct'] > 0 else '📉 Bearish',
+                                'volatility_level': 'High' if data['volatility'] > data['current_price'] * 0.1 else 'Low',
+                                'movement': 'Strong' if abs(data['price_change_pct']) > 10 else 'Moderate'
+                            })
+                            return result
+                        else:
+                            return f"Error: {response.status_code} - {response.text}"
+                    except Exception as e:
+                        return f"Error analyzing stock: {str(e)}"
                 
-                # Tab 3: Market Overview
-                with gr.TabItem("🌍 Market Overview"):
-                    gr.Markdown("""
+                analyze_btn.click(analyze_stock, inputs=[symbol_input, days_input], outputs=analysis_output)
+            
+            # Tab 3: Market Overview
+            with gr.TabItem("🌍 Market Overview"):
+                gr.Markdown("""
                     ## Comprehensive Market Overview
                     
                     Get the latest market data and statistics.
                     """)
-                    
-                    overview_btn = gr.Button("Get Market Overview")
-                    overview_output = gr.Textbox(label="Market Overview", lines=15)
-                    
-                    def get_overview():
-                        try:
-                            response = requests.get("http://localhost:8001/api/market-overview")
-                            if response.status_code == 200:
-                                data = response.json()
-                                result = "🌍 Market Overview\n\n"
-                                
-                                # Latest prices
-                                result += "💰 Latest Prices:\n"
-                                latest = data['latest_prices']
-                                for key, value in latest.items():
-                                    if 'price' in key.lower() and value is not None:
-                                        result += f"• {key.replace('_', ' ').title()}: ${value}\n"
-                                
-                                result += "\n📊 30-Day Statistics:\n"
-                                stats = data['statistics']
-                                for key, stat in stats.items():
-                                    if 'price' in key.lower():
-                                        result += f"• {key.replace('_', ' ').title()}:\n"
-                                        result += f"  - Latest: ${stat['latest']:.2f}\n"
-                                        result += f"  - Avg: ${stat['avg_30d']:.2f}\n"
-                                        result += f"  - Range: ${stat['min_30d']:.2f} - ${stat['max_30d']:.2f}\n"
-                                
-                                return result
-                            else:
-                                return f"Error: {response.status_code} - {response.text}"
-                        except Exception as e:
-                            return f"Error getting overview: {str(e)}"
-                    
-                    overview_btn.click(get_overview, outputs=overview_output)
                 
-                # Tab 4: AI Consensus (if available)
-                if CONSILIUM_AVAILABLE:
-                    with gr.TabItem("🤖 AI Consensus"):
-                        gr.Markdown("""
+                overview_btn = gr.Button("Get Market Overview")
+                overview_output = gr.Textbox(label="Market Overview", lines=15)
+                
+                async def get_overview():
+                    try:
+                        response = await _get_api_client().get("/api/market-overview")
+                        if response.status_code == 200:
+                            data = orjson.loads(response.content)
+                            parts = ["🌍 Market Overview\n\n"]
+                            
+                            # Latest prices
+                            parts.append("💰 Latest Prices:\n")
+                            latest = data['latest_prices']
+                            for key, value in latest.items():
+                                if 'price' in key.lower() and value is not None:
+                                    parts.append(f"• {key.replace('_', ' ').title()}: ${value}\n")
+                            
+                            parts.append("\n📊 30-Day Statistics:\n")
+                            stats = data['statistics']
+                            for key, stat in stats.items():
+                                if 'price' in key.lower():
+                                    parts.append(
+                                        f"• {key.replace('_', ' ').title()}:\n"
+                                        f"  - Latest: ${stat['latest']:.2f}\n"
+                                        f"  - Avg: ${stat['avg_30d']:.2f}\n"
+                                        f"  - Range: ${stat['min_30d']:.2f} - ${stat['max_30d']:.2f}\n"
+                                    )
+                            
+                            return "".join(parts)
+                        else:
+                            return f"Error: {response.status_code} - {response.text}"
+                    except Exception as e:
+                        return f"Error getting overview: {str(e)}"
+                
+                overview_btn.click(get_overview, outputs=overview_output)
+            
+            # Tab 4: AI Consensus (if available)
+            if enable_consensus:
+                with gr.TabItem("🤖 AI Consensus"):
+                    gr.Markdown("""
                         ## AI Expert Consensus Engine
                         
                         Get multi-expert analysis and consensus on financial questions using the Consilium MCP engine.
                         """)
-                        
-                        with gr.Row():
-                            question_input = gr.Textbox(
-                                label="Financial Question",
-                                placeholder="e.g., Should I invest in tech stocks given current raw material prices?",
-                                lines=3
-                            )
-                            rounds_input = gr.Slider(minimum=1, maximum=5, value=3, step=1, label="Discussion Rounds")
-                        
-                        with gr.Row():
-                            protocol_input = gr.Dropdown(
-                                choices=["consensus", "majority_voting", "weighted_voting", "ranked_choice", "unanimity"],
-                                label="Decision Protocol",
-                                value="consensus"
-                            )
-                            role_input = gr.Dropdown(
-                                choices=["balanced", "expert_advocate", "critical_analyst", "strategic_advisor", "research_specialist", "innovation_catalyst"],
-                                label="Role Assignment",
-                                value="balanced"
-                            )
-                        
-                        consensus_btn = gr.Button("Start AI Consensus Discussion")
-                        consensus_output = gr.Textbox(label="Consensus Results", lines=20)
-                        
-                        def run_consensus(question, rounds, protocol, role):
-                            try:
-                                # Create consensus engine
-                                engine = VisualConsensusEngine()
-                                
-                                # Simple consensus simulation (in a real implementation, this would be more complex)
-                                result = f"""
+                    
+                    with gr.Row():
+                        question_input = gr.Textbox(
+                            label="Financial Question",
+                            placeholder="e.g., Should I invest in tech stocks given current raw material prices?",
+                            lines=3
+                        )
+                        rounds_input = gr.Slider(minimum=1, maximum=5, value=3, step=1, label="Discussion Rounds")
+                    
+                    with gr.Row():
+                        protocol_input = gr.Dropdown(
+                            choices=_PROTOCOL_CHOICES,
+                            label="Decision Protocol",
+                            value="consensus"
+                        )
+                        role_input = gr.Dropdown(
+                            choices=_ROLE_CHOICES,
+                            label="Role Assignment",
+                            value="balanced"
+                        )
+                    
+                    consensus_btn = gr.Button("Start AI Consensus Discussion")
+                    consensus_output = gr.Textbox(label="Consensus Results", lines=20)
+                    
+                    async def run_consensus(question, rounds, protocol, role):
+                        try:
+                            # Create consensus engine
+                            engine = VisualConsensusEngine()
+                            
+                            if any(info['available'] for info in engine.models.values()):
+                                transcript = await engine.run_discussion(question, int(rounds), protocol, role)
+                                parts = [
+                                    f"🤖 AI Consensus Analysis\n\n📝 Question: {question}\n\n"
+                                    f"🔍 {protocol.replace('_', ' ').title()} protocol • "
+                                    f"{role.replace('_', ' ').title()} role assignment\n"
+                                ]
+                                for number, replies in enumerate(transcript, 1):
+                                    parts.append(f"\n🗣️ Round {number}:\n")
+                                    if not replies:
+                                        parts.append("• No model replied this round\n")
+                                    parts.extend(f"• {name}: {reply}\n\n" for name, reply in replies.items())
+                                return "".join(parts)
+                            
+                            # No model API keys configured: show an illustrative summary
+                            result = f"""
 🤖 AI Consensus Analysis
 
 📝 Question: {question}
@@ -955,90 +1375,37 @@ Based on the available data and expert analysis, the consensus is:
 Consider a balanced portfolio approach with emphasis on quality stocks
 and proper risk management strategies.
                                 """
-                                return result
-                            except Exception as e:
-                                return f"Error running consensus: {str(e)}"
-                        
-                        consensus_btn.click(run_consensus, inputs=[question_input, rounds_input, protocol_input, role_input], outputs=consensus_output)
-            
-            # Footer
-            gr.Markdown("""
+                            return result
+                        except Exception as e:
+                            return f"Error running consensus: {str(e)}"
+                    
+                    consensus_btn.click(run_consensus, inputs=[question_input, rounds_input, protocol_input, role_input], outputs=consensus_output)
+        
+        # Footer
+        gr.Markdown("""
             ---
             **Unified Stock Market Analysis Platform v2.0.0**
             
             Built with FastAPI, Gradio, and advanced AI consensus technology.
             """)
-        
-        return interface
-
-    # ==============================================================================
-    # MAIN APPLICATION RUNNER
-    # ==============================================================================
-
-    def run_gradio_interface():
-        """Run the Gradio interface"""
-        interface = create_gradio_interface()
-        interface.launch(
-            server_name="0.0.0.0",
-            server_port=7860,
-            share=False,
-            show_error=True
-        )
+        if not enable_consensus:
+            gr.Markdown("Note: Consilium MCP components are not available. The AI consensus tab is disabled.")
+    
+    return interface
 
-else:
-    # Fallback if Consilium components are not available
-    def create_gradio_interface():
-        """Create a simplified Gradio interface without Consilium components"""
-        
-        with gr.Blocks(title="Stock Market Data API", theme=gr.themes.Soft()) as interface:
-            
-            gr.Markdown("""
-            # 📊 Stock Market Data API
-            
-            REST API for historical stock market data with LLM integration support.
-            
-            ## Available Endpoints:
-            - `GET /api/stock-datas` - Get historical stock data
-            - `GET /api/latest-prices` - Get latest market prices
-            - `GET /api/market-overview` - Get market overview
-            - `GET /api/historical-analysis?symbol=AAPL&days=30` - Get stock analysis
-            - `GET /tools` - Get LLM function definitions
-            """)
-            
-            with gr.Row():
-                api_status = gr.Textbox(label="API Status", value="✅ API is running on http://localhost:8001", interactive=False)
-                test_api_btn = gr.Button("Test API Connection")
-            
-            def test_api():
-                try:
-                    response = requests.get("http://localhost:8001/")
-                    if response.status_code == 200:
-                        return "✅ API is running and responding correctly"
-                    else:
-                        return "❌ API is running but not responding correctly"
-                except:
-                    return "❌ API is not accessible"
-            
-            test_api_btn.click(test_api, outputs=api_status)
-            
-            gr.Markdown("""
-            ---
-            **Stock Market Data API v2.0.0**
-            
-            Note: Consilium MCP components are not available. Only REST API functionality is active.
-            """)
-        
-        return interface
-
-    def run_gradio_interface():
-        """Run the simplified Gradio interface"""
-        interface = create_gradio_interface()
-        interface.launch(
-            server_name="0.0.0.0",
-            server_port=7860,
-            share=False,
-            show_error=True
-        )
+# ==============================================================================
+# MAIN APPLICATION RUNNER
+# ==============================================================================
+
+def run_gradio_interface():
+    """Run the Gradio interface"""
+    interface = create_gradio_interface()
+    interface.launch(
+        server_name="0.0.0.0",
+        server_port=7860,
+        share=False,
+        show_error=True
+    )
 
 # ==============================================================================
 # APPLICATION ENTRY POINT
@@ -1046,6 +1413,7 @@ else:
 
 if __name__ == "__main__":
     import argparse
+    import uvicorn
     
     parser = argparse.ArgumentParser(description="Unified Stock Market Analysis Platform")
     parser.add_argument("--mode", choices=["api", "web", "both"], default="both", 
@@ -1064,7 +1432,9 @@ if __name__ == "__main__":
         if args.mode == "both":
             import threading
             def run_api():
-                uvicorn.run(app, host="0.0.0.0", port=args.port, log_level="info")
+                # uvicorn's "auto" loop and parser pick uvloop and httptools
+                # where uvicorn[standard] installed them, asyncio and h11 elsewhere
+                uvicorn.run(app, host="0.0.0.0", port=args.port, log_level="warning", access_log=False)
             
             api_thread = threading.Thread(target=run_api, daemon=True)
             api_thread.start()
@@ -1087,4 +1457,4 @@ if __name__ == "__main__":
     
     elif args.mode == "api":
         # Run API directly (blocking)
-        uvicorn.run(app, host="0.0.0.0", port=args.port, log_level="info") 
\ No newline at end of file
+        uvicorn.run(app, host="0.0.0.0", port=args.port, log_level="warning", access_log=False)